@@ -0,0 +1,199 @@
+import re
+from collections import Counter
+from datetime import datetime
+
+from ip_utils import sort_ips, parse_ip
+
+# Campo de cabecera con la(s) cuenta(s) afectada(s) por el reporte
+ACCOUNT_FIELD = "Object Name(s)"
+DOMAIN_FIELD = "Domain Name"
+PERIOD_FIELD = "Period"
+RECORDS_FIELD = "Number of Records"
+UNKNOWN_ACCOUNT = "<desconocida>"
+
+# Formatos de fecha reconocidos en los extremos del campo Period
+PERIOD_DATE_FORMATS = (
+    "%b %d, %Y %H:%M:%S", "%b %d, %Y %I:%M:%S %p", "%b %d, %Y",
+    "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d",
+    "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y",
+)
+
+def header_accounts(header):
+    """Devuelve las cuentas indicadas en el campo Object Name(s) de una cabecera."""
+    value = header.get(ACCOUNT_FIELD, "")
+    accounts = [a.strip() for a in re.split(r"[,;]", value) if a.strip()]
+    return accounts or [UNKNOWN_ACCOUNT]
+
+def parse_period_date(text):
+    """Convierte un extremo del campo Period en datetime, o None si no se reconoce."""
+    for fmt in PERIOD_DATE_FORMATS:
+        try:
+            return datetime.strptime(text.strip(), fmt)
+        except ValueError:
+            continue
+    return None
+
+def combine_periods(periods):
+    """
+    Combina varios rangos "inicio - fin" en uno que los abarque a todos.
+    Si alguna fecha no se reconoce, se listan los periodos distintos separados por "; ".
+    """
+    distinct = list(dict.fromkeys(p for p in periods if p))
+    if len(distinct) <= 1:
+        return distinct[0] if distinct else ""
+
+    bounds = []
+    for period in distinct:
+        parts = period.split(" - ")
+        if len(parts) != 2:
+            return "; ".join(distinct)
+        start, end = parse_period_date(parts[0]), parse_period_date(parts[1])
+        if start is None or end is None:
+            return "; ".join(distinct)
+        bounds.append((start, parts[0].strip(), end, parts[1].strip()))
+
+    # Se conserva el texto original de las fechas extremas
+    first = min(bounds, key=lambda b: b[0])
+    last = max(bounds, key=lambda b: b[2])
+    return f"{first[1]} - {last[3]}"
+
+def account_key(header):
+    """
+    Clave de agrupación de un reporte: (cuenta, dominio), o None si la cabecera no
+    indica la cuenta (p. ej. un CSV sin metadatos), que no se agrupa con ningún otro.
+    """
+    account = header.get(ACCOUNT_FIELD)
+    if not account:
+        return None
+    return account, header.get(DOMAIN_FIELD, "")
+
+class AccountGroups:
+    """
+    Agrupación incremental de los datos extraídos por cuenta y dominio.
+
+    Cada archivo se incorpora al terminar de procesarse, uniendo sus razones e IPs
+    con las del resto de exportaciones de la misma cuenta.
+    """
+    def __init__(self):
+        self.groups = {}
+
+    def add(self, filename, header, reasons, ips, details=None):
+        """
+        Incorpora los datos de un archivo al grupo de su cuenta. `details` puede traer
+        los conteos de eventos y las ráfagas del archivo, que también se acumulan.
+        La cabecera debe indicar la cuenta (ver account_key).
+        """
+        details = details or {}
+        counts = details.get('counts')
+        bursts = details.get('bursts')
+        key = account_key(header)
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = {
+                'header': dict(header), 'periods': [], 'records': [],
+                'reasons': set(), 'ips': set(), 'files': [], 'counts': None, 'bursts': None,
+            }
+        if counts is not None:
+            if group['counts'] is None:
+                group['counts'] = {'ips': Counter(), 'reasons': Counter(), 'pairs': Counter()}
+            for field in ('ips', 'reasons', 'pairs'):
+                group['counts'][field].update(counts[field])
+        if bursts is not None:
+            if group['bursts'] is None:
+                group['bursts'] = {'ip': [], 'account': []}
+            for field in ('ip', 'account'):
+                group['bursts'][field].extend(bursts[field])
+        group['periods'].append(header.get(PERIOD_FIELD, ""))
+        group['records'].append(header.get(RECORDS_FIELD, ""))
+        group['reasons'].update(reasons)
+        group['ips'].update(ips)
+        group['files'].append(filename)
+
+    def __len__(self):
+        return len(self.groups)
+
+    def items(self):
+        """
+        Devuelve (cuenta, dominio, archivos, header, reasons, ips, details) de cada grupo;
+        details incluye los conteos y las ráfagas acumulados si los hay.
+        """
+        for (account, domain), group in self.groups.items():
+            header = dict(group['header'])
+            header[PERIOD_FIELD] = combine_periods(group['periods'])
+            records = group['records']
+            if records and all(r.strip().isdigit() for r in records):
+                header[RECORDS_FIELD] = str(sum(int(r) for r in records))
+            details = {}
+            if group['counts'] is not None:
+                details['counts'] = group['counts']
+            if group['bursts'] is not None:
+                # Las ráfagas de los distintos archivos se listan de mayor a menor
+                details['bursts'] = {
+                    field: sorted(bursts, key=lambda b: (-b['events'], b['key'], b['start']))
+                    for field, bursts in group['bursts'].items()
+                }
+            yield account, domain, group['files'], header, sorted(group['reasons']), sort_ips(group['ips']), details
+
+class BatchIndex:
+    """
+    Índice en memoria de IPs y razones de todo un lote de archivos.
+
+    Se construye de forma incremental a medida que termina cada archivo, así que solo
+    guarda los valores únicos de cada uno: IP -> archivos, cuentas y razones, y
+    cuenta -> IPs.
+    """
+    def __init__(self):
+        self.ip_files = {}
+        self.ip_accounts = {}
+        self.ip_reasons = {}
+        self.account_ips = {}
+        self.files = 0
+
+    def add(self, filename, header, ips, pairs):
+        """
+        Incorpora al índice los datos extraídos de un archivo. Las razones de cada IP
+        salen de los pares (IP, razón) de sus filas, no de todas las razones del archivo.
+        """
+        self.files += 1
+        accounts = header_accounts(header)
+        for account in accounts:
+            self.account_ips.setdefault(account, set()).update(ips)
+        for ip in ips:
+            self.ip_files.setdefault(ip, set()).add(filename)
+            self.ip_accounts.setdefault(ip, set()).update(accounts)
+            self.ip_reasons.setdefault(ip, set())
+        for ip, reason in pairs:
+            self.ip_reasons.setdefault(ip, set()).add(reason)
+
+    def ranked_ips(self):
+        """IPs ordenadas por alcance: número de cuentas y luego de archivos en que aparecen."""
+        return sorted(
+            self.ip_files,
+            key=lambda ip: (-len(self.ip_accounts[ip]), -len(self.ip_files[ip]), parse_ip(ip) or (7, 0), ip),
+        )
+
+    def render_summary(self, top=None):
+        """Devuelve el texto del reporte consolidado, limitado a las `top` IPs con más alcance."""
+        ranked = self.ranked_ips()
+        if top:
+            ranked = ranked[:top]
+
+        lines = ["=" * 50, "", "=== Resumen Consolidado del Lote ==="]
+        lines.append(f"Archivos analizados: {self.files}")
+        lines.append(f"IPs distintas: {len(self.ip_files)}")
+        lines.append(f"Cuentas distintas: {len(self.account_ips)}")
+        lines.append("")
+        lines.append("=== IPs por Alcance ===")
+        for ip in ranked:
+            accounts = self.ip_accounts[ip]
+            lines.append(f"- {ip}: {len(accounts)} cuenta(s), {len(self.ip_files[ip])} archivo(s)")
+            lines.append(f"    Cuentas: {', '.join(sorted(accounts))}")
+            lines.append(f"    Razones: {', '.join(sorted(self.ip_reasons[ip]))}")
+            lines.append(f"    Archivos: {', '.join(sorted(self.ip_files[ip]))}")
+        lines.append("")
+        lines.append("=== IPs por Cuenta ===")
+        for account in sorted(self.account_ips, key=lambda a: (-len(self.account_ips[a]), a)):
+            ips = self.account_ips[account]
+            lines.append(f"- {account}: {len(ips)} IP(s)")
+            lines.append(f"    {', '.join(sort_ips(ips))}")
+        return "\n".join(lines) + "\n"
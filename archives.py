@@ -0,0 +1,52 @@
+import os
+import gzip
+import tarfile
+import zipfile
+
+# Extensiones de las exportaciones que se leen de los archivos comprimidos
+MEMBER_EXTENSIONS = ('.xls', '.xlsx', '.csv')
+# Archivos comprimidos soportados (.gz incluye .tar.gz y p. ej. .csv.gz)
+ARCHIVE_EXTENSIONS = ('.zip', '.gz', '.tgz')
+
+def is_archive(path):
+    """Indica si la ruta corresponde a un archivo comprimido soportado."""
+    return path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+def archive_stem(name):
+    """
+    Nombre de un comprimido sin sus extensiones (p. ej. "lote.tar.gz" -> "lote" y
+    "export.csv.gz" -> "export").
+    """
+    lower = name.lower()
+    for ext in ('.tar.gz',) + ARCHIVE_EXTENSIONS:
+        if lower.endswith(ext):
+            name = name[:-len(ext)]
+            break
+    base, ext = os.path.splitext(name)
+    return base if ext.lower() in MEMBER_EXTENSIONS else name
+
+def iter_members(path):
+    """
+    Recorre las exportaciones contenidas en un .zip, .tar.gz/.tgz o .gz y devuelve
+    (nombre, archivo binario) de cada una, descomprimiendo en flujo sin escribir
+    copias en disco. Cada archivo solo es válido hasta pasar al siguiente miembro.
+    """
+    lower = path.lower()
+    if lower.endswith('.zip'):
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(MEMBER_EXTENSIONS):
+                    with zf.open(info) as f:
+                        yield info.filename, f
+    elif lower.endswith(('.tar.gz', '.tgz')):
+        # Los miembros se recorren en orden, así que el .tar se descomprime una sola vez
+        # de principio a fin (el modo "r|gz" no sirve: sus miembros no admiten seekable())
+        with tarfile.open(path, 'r:gz') as tf:
+            for member in tf:
+                if member.isfile() and member.name.lower().endswith(MEMBER_EXTENSIONS):
+                    yield member.name, tf.extractfile(member)
+    elif lower.endswith('.gz'):
+        name = os.path.basename(path)[:-3]
+        if name.lower().endswith(MEMBER_EXTENSIONS):
+            with gzip.open(path, 'rb') as f:
+                yield name, f
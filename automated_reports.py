@@ -1,235 +1,1585 @@
 import os
-import sys
 import io
-import pandas as pd
-from openpyxl import load_workbook
+import sys
+import csv
 import re
+import json
+import time
+import zipfile
+import threading
 from datetime import datetime
 import logging
+from collections import Counter
+from itertools import chain, islice
+from manifest import ExtractionManifest
+from aggregation import BatchIndex, AccountGroups, account_key, header_accounts
+from bursts import EventTimeline
+from report_writer import ReportWriter, write_atomic
+from archives import ARCHIVE_EXTENSIONS, archive_stem, is_archive, iter_members
+from results_store import ResultsStore
+from history import ResultsHistory
+from report_templates import ReportTemplates
+from isolation import IsolatedRunner, CANCELLED
+from inventory import Inventory, INVENTORY_FILE
+from ip_utils import canonical_ip, sort_ips, collapse_ips
+
+LOG_FILE = 'process_reports.log'
+# Métricas de cada ejecución (una línea JSON por ejecución), junto al log
+METRICS_FILE = 'process_reports_metrics.jsonl'
+
+# Extensiones de los archivos de origen soportados (también comprimidos)
+SOURCE_EXTENSIONS = ('.xls', '.xlsx', '.csv') + ARCHIVE_EXTENSIONS
+
+# Claves de las métricas por archivo: tiempos por etapa (segundos) y contadores
+METRIC_STAGES = ('open', 'parse', 'unique', 'bursts', 'write')
+METRIC_COUNTERS = ('rows', 'distinct_ips', 'distinct_reasons', 'bytes_read')
 
 # Configuración del logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.FileHandler('process_reports.log'),
+        logging.FileHandler(LOG_FILE),
         logging.StreamHandler()
     ]
 )
 
-# Forzar la codificación UTF-8 en Windows
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+# Valores que se consideran vacíos en los CSV (los mismos que pandas por defecto)
+CSV_NA_VALUES = frozenset({
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+})
+
+def configure_utf8_stdout():
+    """Fuerza la codificación UTF-8 en la salida estándar (consola de Windows)."""
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
+
+def source_file(source):
+    """
+    Archivo de input_dir al que pertenece un origen: el propio archivo o, para una
+    exportación dentro de un comprimido ("<comprimido>/<miembro>"), el comprimido.
+    """
+    return source.split("/", 1)[0]
+
+def report_name(source):
+    """
+    Nombre base de los reportes de un origen: el del archivo sin extensión o, para una
+    exportación dentro de un comprimido, <comprimido>_<miembro> (con sus carpetas).
+    """
+    archive, sep, member = source.partition("/")
+    if not (sep and is_archive(archive)):
+        return os.path.splitext(os.path.basename(source))[0]
+    stem = archive_stem(archive)
+    member = re.sub(r"[^\w.-]+", "_", os.path.splitext(member)[0]).strip("_")
+    # Un .gz contiene una sola exportación, normalmente con el mismo nombre
+    return stem if member == stem else f"{stem}_{member}"
+
+# Filas de la hoja (o líneas del CSV) que pueden contener la cabecera del reporte
+HEADER_ROWS = 9
+# Espacio de nombres de SpreadsheetML usado en las hojas de un .xlsx
+XLSX_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+XLSX_SHEET = "xl/worksheets/sheet1.xml"
+XLSX_SHARED_STRINGS = "xl/sharedStrings.xml"
+CELL_REF_RE = re.compile(r"([A-Z]+)(\d+)$")
+# Sección final del informe intermedio con la categoría de fallo que elige el pie del
+# reporte final (calculada con todas las razones, aunque top_n recorte la lista)
+CATEGORY_SECTION = "=== Categoría de Fallo ==="
+# Línea de una razón en el informe intermedio, con el número de eventos opcional
+REASON_LINE_RE = re.compile(r"(.*?)(?: \((\d+) eventos\))?$")
+
+class UnexpectedLayoutError(Exception):
+    """El archivo no tiene la estructura esperada por la lectura rápida de .xlsx."""
+
+class ColumnAccumulator:
+    """
+    Acumula por bloques las IPs y razones de las filas de datos de un archivo.
+    Sin conteo solo se guardan los valores únicos; con conteo se cuentan los eventos
+    de cada par (IP, razón) con Counter.update sobre cada bloque, y al final se
+    agregan por IP y por razón. Con `keep_pairs` también se guardan los pares
+    (IP, razón) distintos sin contar (ver ip_reason_pairs). Las IPs se devuelven en
+    su escritura canónica, sumando los eventos de las distintas escrituras de una misma IP.
+    """
+    def __init__(self, count=False, chunksize=10_000, na_values=(), keep_pairs=False):
+        self.count = count
+        self.chunksize = chunksize
+        self.missing = set(na_values) | {None}
+        self.keep_pairs = keep_pairs and not count
+        self.ips = set()
+        self.reasons = set()
+        self.pairs = Counter()
+        self.distinct_pairs = set()
+        self.rows = 0
+        self._chunk = []
+
+    def add(self, ip, reason):
+        """Añade una fila de datos."""
+        self._chunk.append((ip, reason))
+        if len(self._chunk) >= self.chunksize:
+            self.flush()
+
+    def add_many(self, pairs):
+        """Añade un bloque de filas (ip, razón)."""
+        self._chunk.extend(pairs)
+        if len(self._chunk) >= self.chunksize:
+            self.flush()
+
+    def flush(self):
+        """Incorpora el bloque pendiente a los conjuntos o a los contadores."""
+        chunk = self._chunk
+        if not chunk:
+            return
+        self.rows += len(chunk)
+        if self.count:
+            self.pairs.update(chunk)
+        else:
+            self.ips.update(ip for ip, _ in chunk)
+            self.reasons.update(reason for _, reason in chunk)
+            if self.keep_pairs:
+                self.distinct_pairs.update(chunk)
+        self._chunk = []
+
+    def ip_reason_pairs(self):
+        """Devuelve los pares (IP, razón) distintos con ambos valores presentes."""
+        self.flush()
+        missing = self.missing
+        pairs = self.pairs if self.count else self.distinct_pairs
+        canonical = self._canonical_ips(ip for ip, _ in pairs)
+        return {(canonical[ip], reason) for ip, reason in pairs if ip not in missing and reason not in missing}
+
+    def _canonical_ips(self, ips):
+        """Escritura canónica de cada IP distinta (se calcula una vez por valor, no por fila)."""
+        return {ip: canonical_ip(ip) for ip in set(ips) if ip not in self.missing}
+
+    def result(self):
+        """Devuelve (ips, razones, conteos); los conteos son None si no se está contando."""
+        self.flush()
+        missing = self.missing
+        if not self.count:
+            return set(self._canonical_ips(self.ips).values()), self.reasons - missing, None
+        
+        # Agregación por grupos: se recorre cada par distinto, no cada fila
+        canonical = self._canonical_ips(ip for ip, _ in self.pairs)
+        ip_counts, reason_counts, pair_counts = Counter(), Counter(), Counter()
+        for (ip, reason), n in self.pairs.items():
+            if ip not in missing:
+                ip_counts[canonical[ip]] += n
+            if reason not in missing:
+                reason_counts[reason] += n
+                if ip not in missing:
+                    pair_counts[(canonical[ip], reason)] += n
+        counts = {'ips': ip_counts, 'reasons': reason_counts, 'pairs': pair_counts}
+        return set(ip_counts), set(reason_counts), counts
 
 class ReportProcessor:
-    def __init__(self, input_dir="xls_folder", temp_dir="reports", output_dir="rapport2"):
+    def __init__(self, input_dir="xls_folder", temp_dir="reports", output_dir="rapport2",
+                 parallel=False, max_workers=None, fast_xlsx=False, csv_chunksize=100_000,
+                 use_manifest=False, manifest_path=None, manifest_hash=False, force_rebuild=False,
+                 dump_metrics=False, metrics_path=METRICS_FILE, aggregate=False, summary_top=None,
+                 group_by_account=False, collapse_cidr=False, count_events=False, top_n=None,
+                 burst_threshold=None, burst_window=10, writer_threads=0,
+                 store_path=None, store_only=False, templates_dir=None, progress=None,
+                 file_timeout=None, file_memory_mb=None, isolate=False, cancel_event=None):
         self.input_dir = input_dir
         self.temp_dir = temp_dir
         self.output_dir = output_dir
+        # Modo de procesamiento en paralelo (un proceso por núcleo por defecto)
+        self.parallel = parallel
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # Lectura directa del XML de los .xlsx (con respaldo en openpyxl)
+        self.fast_xlsx = fast_xlsx
+        # Filas leídas por bloque en los CSV (la memoria depende de los valores únicos)
+        self.csv_chunksize = csv_chunksize
+        # Manifiesto para no volver a leer archivos sin cambios entre ejecuciones
+        self.use_manifest = use_manifest
+        self.manifest_path = manifest_path or os.path.join(temp_dir, "manifest.json")
+        # Inventario de las cabeceras de input_dir (ver scan_inventory)
+        self.inventory_path = os.path.join(temp_dir, INVENTORY_FILE)
+        self.manifest_hash = manifest_hash
+        self.force_rebuild = force_rebuild
+        # Métricas por archivo y por etapa de la última ejecución
+        self.dump_metrics = dump_metrics
+        self.metrics_path = metrics_path
+        self.metrics = {'files': {}}
+        # Índice de IPs y cuentas de todo el lote y reporte consolidado
+        self.aggregate = aggregate
+        self.summary_top = summary_top
+        self.batch_index = None
+        self.summary_path = None
+        # Un único reporte final por cuenta y dominio en lugar de uno por archivo
+        self.group_by_account = group_by_account
+        # Mostrar las IPs contiguas agrupadas en bloques CIDR en los reportes
+        self.collapse_cidr = collapse_cidr
+        # Conteo de eventos por IP, razón y par (IP, razón), y límite de elementos por lista
+        self.count_events = count_events
+        self.top_n = top_n
+        # Detección de ráfagas: más de burst_threshold fallos en burst_window minutos
+        self.burst_threshold = burst_threshold
+        self.burst_window = burst_window
+        self.bursts = {}
+        # Hilos de escritura de reportes en segundo plano (0: escritura en el hilo principal)
+        self.writer_threads = writer_threads
+        self._writer = None
+        # Almacén SQLite de resultados; con store_only no se escriben reportes de texto
+        self.store_path = store_path
+        self.store_only = store_only and store_path is not None
+        self.store = None
+        self._history = None
+        self.file_details = {}
+        # Origen de cada reporte intermedio de la última extracción (para la segunda etapa)
+        self.report_sources = {}
         self.setup_directories()
         
-        self.header_fields = {
-            "Report Name": re.compile(r"Report Name\s*:\s*(.*)"),
-            "Period": re.compile(r"Period\s*:\s*(.*)"),
-            "Domain Name": re.compile(r"Domain Name\s*:\s*(.*)"),
-            "Annotation": re.compile(r"Annotation\s*:\s*(.*)"),
-            "Number of Records": re.compile(r"Number of Records\s*:\s*(.*)"),
-            "Object Name\\(s\\)": re.compile(r"Object Name\\(s\\)\s*:\s*(.*)"),
-            "Business Hour Setting": re.compile(r"Business Hour Setting\s*:\s*(.*)"),
-            "Filter": re.compile(r"Filter\s*:\s*(.*)"),
-            "Generated At": re.compile(r"Generated At\s*:\s*(.*)")
-        }
+        # Campos de cabecera, en el orden en que se muestran en los reportes
+        self.header_fields = (
+            "Report Name", "Period", "Domain Name", "Annotation", "Number of Records",
+            "Object Name(s)", "Business Hour Setting", "Filter", "Generated At",
+        )
+        # Todos los campos en una sola expresión: una búsqueda por línea en lugar de una por campo
+        self.header_pattern = re.compile(
+            "(" + "|".join(re.escape(k) for k in self.header_fields) + r")\s*:\s*(.*)")
         
-        self.message_header = '''\
-Cordial Saludo
-
-Debido a los repetidos intentos fallidos de login recibidos, a continuación, les indico los detalles del hallazgo para que por favor procedan a canalizar su solución.
+        # Callback que recibe los eventos de progreso por archivo (p. ej. queue.put de la GUI)
+        self.progress = progress
+        # Cada archivo en su propio proceso, que se mata si supera el tiempo o la memoria
+        self.file_timeout = file_timeout
+        self.file_memory_mb = file_memory_mb
+        self.isolate = isolate or bool(file_timeout or file_memory_mb)
+        # Token de cancelación de la ejecución (ver cancel() y reset_cancel())
+        self.cancel_event = cancel_event or threading.Event()
+        # Encabezado y pies de mensaje de los reportes finales (el pie depende de la razón)
+        self.templates = ReportTemplates(templates_dir)
 
-'''
-        
-        self.message_footer = '''
-Después de analizar los logon failures del usuario, se pudo comprobar lo siguiente: Esta cuenta amerita realizar logoff/on de los equipos donde se encuentra logueado actualmente y borrar los datos del credential manager, ya que el mismo puede deberse a cambios recientes en la contraseña o a la necesidad de realizar el cambio.
-'''
+    def __getstate__(self):
+        """
+        Estado enviado a los procesos del pool: sin el pool de escritura ni la conexión
+        SQLite (que no se pueden serializar) ni los datos acumulados del lote.
+        """
+        state = self.__dict__.copy()
+        state.update(_writer=None, store=None, _history=None, progress=None, cancel_event=None,
+                     batch_index=None, file_details={}, bursts={}, report_sources={},
+                     metrics={'files': {}})
+        return state
 
     def setup_directories(self):
         """Crea los directorios necesarios si no existen."""
         for directory in [self.temp_dir, self.output_dir]:
             os.makedirs(directory, exist_ok=True)
 
-    def extract_header(self, path):
-        """Extrae la información del encabezado de un archivo Excel."""
+    def extract_header(self, path, stream=None):
+        """
+        Extrae la información del encabezado de un archivo de origen leyendo solo sus
+        primeras filas, sin recorrer los datos: las filas 1-9 de la hoja en Excel y las
+        líneas de metadatos iniciales en CSV. En un comprimido se usa la cabecera del
+        primer miembro que la tenga. Si se pasa `stream`, se lee de él en lugar de `path`.
+        """
         try:
-            wb = load_workbook(path, read_only=True, data_only=True)
-            ws = wb.active
-            lines = [
-                str(row[0]) for row in ws.iter_rows(min_row=1, max_row=9, max_col=1, values_only=True)
-                if row[0]
-            ]
-            data = {}
-            for line in lines:
-                for key, rx in self.header_fields.items():
-                    m = rx.search(line)
-                    if m:
-                        data[key] = m.group(1).strip()
-            return data
+            return self._parse_header_lines(self._read_header_lines(path, stream))
         except Exception as e:
             logging.error(f"Error al extraer el encabezado de {path}: {e}")
             return {}
 
-    def process_file(self, path):
-        """Procesa un archivo de origen (Excel o CSV) para extraer datos."""
+    def _read_header_lines(self, path, stream=None):
+        """Devuelve las líneas de cabecera de un archivo de origen (ver extract_header)."""
+        if stream is None and is_archive(path):
+            for name, member in iter_members(path):
+                if not name.lower().endswith('.csv'):
+                    # Excel necesita acceso aleatorio: el miembro se carga en memoria
+                    member = io.BytesIO(member.read())
+                lines = self._read_header_lines(name, member)
+                if lines:
+                    return lines
+            return []
+
+        if path.lower().endswith('.csv'):
+            if stream is None:
+                f = open(path, newline='', encoding='utf-8-sig')
+            else:
+                f = io.TextIOWrapper(stream, newline='', encoding='utf-8-sig')
+            with f:
+                return self._split_csv_preamble(f)[0]
+
+        source = path if stream is None else stream
+        if self.fast_xlsx and zipfile.is_zipfile(source):
+            try:
+                return self._read_xlsx_header_lines(source)
+            except Exception as e:
+                logging.warning(f"Lectura rápida no disponible para {path} ({e}), se usa openpyxl.")
+
+        from openpyxl import load_workbook  # Importación diferida: solo se necesita para Excel
+        
+        wb = load_workbook(source, read_only=True, data_only=True)
+        try:
+            ws = wb.active
+            return [
+                str(row[0]) for row in ws.iter_rows(min_row=1, max_row=HEADER_ROWS, max_col=1, values_only=True)
+                if row[0]
+            ]
+        finally:
+            wb.close()
+
+    def _split_csv_preamble(self, f):
+        """
+        Separa las líneas de metadatos iniciales de un CSV (hasta HEADER_ROWS) del resto.
+        Devuelve las líneas de cabecera y un iterador de líneas que empieza en la fila de
+        columnas, la primera que no es de metadatos.
+        """
+        lines = []
+        for line in islice(f, HEADER_ROWS):
+            if not self.header_pattern.search(line):
+                return lines, chain([line], f)
+            lines.append(line.strip())
+        return lines, f
+
+    def _read_xlsx_header_lines(self, path):
+        """
+        Lee del XML de un .xlsx solo la columna A de las filas de cabecera: la hoja se
+        deja de analizar al pasar de la fila HEADER_ROWS y de las cadenas compartidas
+        solo se lee hasta la última que usan esas celdas.
+        """
+        import xml.etree.ElementTree as ET
+        
+        cells = []
+        with zipfile.ZipFile(path) as zf:
+            names = set(zf.namelist())
+            if XLSX_SHEET not in names:
+                raise UnexpectedLayoutError(f"no contiene {XLSX_SHEET}")
+            with zf.open(XLSX_SHEET) as f:
+                for _, elem in ET.iterparse(f):
+                    if elem.tag != XLSX_NS + "c":
+                        continue
+                    m = CELL_REF_RE.match(elem.get("r", ""))
+                    if not m:
+                        raise UnexpectedLayoutError("celda sin referencia")
+                    if int(m.group(2)) > HEADER_ROWS:
+                        break
+                    if m.group(1) == "A":
+                        cells.append(elem)
+            
+            needed = [int(c.find(XLSX_NS + "v").text) for c in cells
+                      if c.get("t") == "s" and c.find(XLSX_NS + "v") is not None]
+            shared = []
+            if needed and XLSX_SHARED_STRINGS in names:
+                with zf.open(XLSX_SHARED_STRINGS) as f:
+                    shared = self._read_shared_strings(f, limit=max(needed) + 1)
+        
+        values = (self._xlsx_cell_value(c, shared) for c in cells)
+        return [value for value in values if value]
+
+    def _parse_header_lines(self, lines):
+        """
+        Aplica los campos de cabecera a las líneas de texto con una sola expresión
+        combinada. Como con una expresión por campo, cada campo toma el resto de la
+        línea tras su primera aparición y las líneas posteriores tienen prioridad.
+        """
+        data = {}
+        search = self.header_pattern.search
+        for line in lines:
+            found = set()
+            m = search(line)
+            while m:
+                key = m.group(1)
+                if key not in found:
+                    found.add(key)
+                    data[key] = m.group(2).strip()
+                # El valor de un campo puede contener a su vez otro campo
+                m = search(line, m.start(2))
+        return data
+
+    def process_file(self, path, stats=None, details=None):
+        """
+        Procesa un archivo de origen (Excel, CSV o un comprimido que los contenga) para extraer datos.
+        Si se pasa un diccionario `stats`, se rellena con las métricas de lectura, y si se
+        pasa `details`, con los datos adicionales (p. ej. los conteos de eventos).
+        Un comprimido no devuelve (header, reasons, ips) sino la lista de sus
+        exportaciones, cada una con su propio resultado (ver _process_archive).
+        """
         file_ext = os.path.splitext(path)[1].lower()
+        if stats is None:
+            stats = {}
+        if details is None:
+            details = {}
 
-        if file_ext in ['.xls', '.xlsx']:
-            return self._process_excel_file(path)
+        if is_archive(path):
+            result = self._process_archive(path, stats)
+            reasons = {r for _, (_, member_reasons, _), _ in result for r in member_reasons}
+            ips = {ip for _, (_, _, member_ips), _ in result for ip in member_ips}
+        elif file_ext in ['.xls', '.xlsx']:
+            result = self._process_excel_file(path, stats, details)
+            header, reasons, ips = result
+            self._detect_bursts(header, reasons, ips, stats, details)
         elif file_ext == '.csv':
-            return self._process_csv_file(path)
+            result = self._process_csv_file(path, stats, details)
+            header, reasons, ips = result
+            self._detect_bursts(header, reasons, ips, stats, details)
         else:
             logging.warning(f"Formato de archivo no soportado: {file_ext}")
             return {}, [], []
 
-    def _process_excel_file(self, path):
-        """Procesa un archivo Excel para extraer datos y metadatos."""
+        stats['bytes_read'] = os.path.getsize(path)
+        stats['distinct_ips'] = len(ips)
+        stats['distinct_reasons'] = len(reasons)
+        return result
+
+    def _detect_bursts(self, header, reasons, ips, stats, details):
+        """Busca las ráfagas en el registro de eventos que el lector dejó en `details`."""
+        timeline = details.pop('timeline', None)
+        if timeline is None or not (reasons or ips):
+            return
+        start = time.perf_counter()
+        accounts = header_accounts(header)
+        details['bursts'] = timeline.detect(self.burst_threshold, self.burst_window,
+                                            default_account=accounts[0] if len(accounts) == 1 else None)
+        stats['bursts'] = stats.get('bursts', 0) + time.perf_counter() - start
+
+    def _process_file_with_stats(self, path):
+        """Procesa un archivo y devuelve (resultado, métricas, detalles); usado por el pool de procesos."""
+        stats = {}
+        details = {}
+        return self.process_file(path, stats, details), stats, details
+
+    def _process_archive(self, path, stats):
+        """
+        Procesa por separado cada exportación contenida en un .zip, .gz o .tar.gz, sin
+        extraerlas a disco, y devuelve [(miembro, (header, reasons, ips), detalles)]:
+        cada exportación conserva su cabecera (cuenta, dominio...) y tiene su propio
+        reporte. Los CSV se leen en flujo; los Excel se cargan en memoria, porque su
+        formato (ZIP) necesita acceso aleatorio.
+        """
+        members = []
         try:
-            header = self.extract_header(path)
-            
-            # Leer la tabla de datos desde la fila 12
-            df = pd.read_excel(path, engine="openpyxl", header=None, skiprows=11)
+            for member, stream in iter_members(path):
+                member_path = f"{path}/{member}"
+                member_stats, member_details = {}, {}
+                if member.lower().endswith('.csv'):
+                    result = self._process_csv_file(member_path, member_stats, member_details, stream)
+                else:
+                    data = io.BytesIO(stream.read())
+                    result = self._process_excel_file(member_path, member_stats, member_details, data)
+                
+                self._detect_bursts(*result, member_stats, member_details)
+                for key in ('open', 'parse', 'unique', 'bursts', 'rows'):
+                    if key in member_stats:
+                        stats[key] = stats.get(key, 0) + member_stats[key]
+                members.append((member, result, member_details))
+        except MemoryError:
+            # Se propaga para que el archivo cuente como fallido (límite de memoria)
+            raise
+        except Exception as e:
+            logging.error(f"Error al leer el archivo comprimido {path}: {e}")
+            return []
+        
+        if not members:
+            logging.warning(f"El archivo comprimido {path} no contiene exportaciones")
+        return members
+
+    def _new_accumulator(self, na_values=(), chunksize=10_000):
+        """
+        Crea el acumulador de IPs y razones según el modo de conteo; con aggregate
+        también guarda los pares (IP, razón) para el resumen consolidado.
+        """
+        return ColumnAccumulator(count=self.count_events, chunksize=chunksize, na_values=na_values,
+                                 keep_pairs=self.aggregate)
+
+    def _accumulator_result(self, acc, details):
+        """
+        Devuelve las IPs y razones de un acumulador y deja en `details` los conteos
+        y, con aggregate, los pares (IP, razón).
+        """
+        ips, reasons, counts = acc.result()
+        if counts is not None:
+            details['counts'] = counts
+        if self.aggregate:
+            details['pairs'] = acc.ip_reason_pairs()
+        return ips, reasons
+
+    def _new_timeline(self, details, na_values=()):
+        """
+        Crea el registro de hora, IP y cuenta de cada fila si la detección de ráfagas
+        está activa (si no, devuelve None). Se deja en `details` para process_file.
+        """
+        if self.burst_threshold is None:
+            return None
+        timeline = details['timeline'] = EventTimeline(na_values)
+        return timeline
+
+    def _process_excel_file(self, path, stats, details, stream=None):
+        """
+        Procesa un archivo Excel para extraer datos y metadatos.
+        El libro se recorre una sola vez: las filas 1-9 (columna A) forman la cabecera
+        y desde la fila 12 solo se conservan las IPs (columna B) y las razones (columna G).
+        Si se pasa `stream` (un archivo binario con seek), se lee de él en lugar de `path`.
+        """
+        source = path if stream is None else stream
+        if self.fast_xlsx and zipfile.is_zipfile(source):
+            try:
+                header_lines, acc = self._read_xlsx_columns(source, stats, self._new_timeline(details))
+                start = time.perf_counter()
+                ips, reasons = self._accumulator_result(acc, details)
+                result = self._parse_header_lines(header_lines), sorted(reasons), sort_ips(ips)
+                stats['unique'] = time.perf_counter() - start
+                return result
+            except MemoryError:
+                raise
+            except Exception as e:
+                logging.warning(f"Lectura rápida no disponible para {path} ({e}), se usa openpyxl.")
+        
+        try:
+            header_lines = []
+            acc = self._new_accumulator()
+            timeline = self._new_timeline(details)
             
-            # Extraer IPs (columna B) y razones (columna G)
-            ips = []
-            reasons = []
+            start = time.perf_counter()
+            from openpyxl import load_workbook  # Importación diferida: solo se necesita para Excel
             
-            if df.shape[1] > 1:
-                ips = pd.Series(df.iloc[:, 1].dropna().astype(str)).unique().tolist()
-                ips.sort()
+            wb = load_workbook(source, read_only=True, data_only=True)
+            stats['open'] = time.perf_counter() - start
             
-            if df.shape[1] > 6:
-                reasons = pd.Series(df.iloc[:, 6].dropna().astype(str)).unique().tolist()
-                reasons.sort()
+            start = time.perf_counter()
+            try:
+                ws = wb.active
+                for row_idx, row in enumerate(ws.iter_rows(max_col=7, values_only=True), start=1):
+                    if row_idx <= HEADER_ROWS:
+                        if row and row[0]:
+                            header_lines.append(str(row[0]))
+                    elif row_idx >= 12:
+                        ip = row[1] if len(row) > 1 else None
+                        reason = row[6] if len(row) > 6 else None
+                        acc.add(None if ip is None else str(ip), None if reason is None else str(reason))
+                        if timeline is not None:
+                            # Hora del evento en la columna A y usuario en la E
+                            timeline.add(row[0] if row else None, None if ip is None else str(ip),
+                                         row[4] if len(row) > 4 else None)
+            finally:
+                wb.close()
+            stats['parse'] = time.perf_counter() - start
             
-            return header, reasons, ips
+            start = time.perf_counter()
+            header = self._parse_header_lines(header_lines)
+            ips, reasons = self._accumulator_result(acc, details)
+            stats['rows'] = acc.rows
+            result = header, sorted(reasons), sort_ips(ips)
+            stats['unique'] = time.perf_counter() - start
+            return result
+        except MemoryError:
+            raise
         except Exception as e:
             logging.error(f"Error al procesar el archivo Excel {path}: {e}")
             return {}, [], []
 
-    def _process_csv_file(self, path):
-        """Procesa un archivo CSV para extraer datos."""
-        try:
-            header = {}  # No hay metadata de cabecera en CSV
-            
-            # Asumimos que la primera fila es el encabezado de la tabla
-            # y que las IPs están en la columna 2 (índice 1) y las razones en la 7 (índice 6)
-            df = pd.read_csv(path, header=0, on_bad_lines='skip', encoding='utf-8')
+    def _read_xlsx_columns(self, path, stats, timeline=None):
+        """
+        Lee directamente el XML de la primera hoja de un .xlsx, conservando solo la
+        columna A de las filas 1-9 y las columnas B y G desde la fila 12 (y A y E si
+        se pasa un `timeline` para la detección de ráfagas).
+        `path` puede ser una ruta o un archivo binario con seek.
+        Devuelve las líneas de cabecera y el ColumnAccumulator con los datos.
+        Lanza UnexpectedLayoutError si el archivo no tiene la estructura esperada.
+        """
+        import xml.etree.ElementTree as ET
+        
+        header_lines = []
+        acc = self._new_accumulator()
+        last_row = 0
+        row_ip = row_reason = row_time = row_user = None
+        
+        start = time.perf_counter()
+        with zipfile.ZipFile(path) as zf:
+            names = set(zf.namelist())
+            if XLSX_SHEET not in names:
+                raise UnexpectedLayoutError(f"no contiene {XLSX_SHEET}")
             
-            ips = []
-            reasons = []
+            shared = []
+            if XLSX_SHARED_STRINGS in names:
+                with zf.open(XLSX_SHARED_STRINGS) as f:
+                    shared = self._read_shared_strings(f)
+            stats['open'] = time.perf_counter() - start
             
-            # Las columnas se leen por nombre si existen, si no por indice.
-            if 'Client IP' in df.columns and 'Reason' in df.columns:
-                 ips = pd.Series(df['Client IP'].dropna().astype(str)).unique().tolist()
-                 ips.sort()
-                 reasons = pd.Series(df['Reason'].dropna().astype(str)).unique().tolist()
-                 reasons.sort()
-            else: # Fallback a indices si las columnas no tienen nombre
-                if df.shape[1] > 1:
-                    ips = pd.Series(df.iloc[:, 1].dropna().astype(str)).unique().tolist()
-                    ips.sort()
+            start = time.perf_counter()
+            with zf.open(XLSX_SHEET) as f:
+                for _, elem in ET.iterparse(f):
+                    if elem.tag == XLSX_NS + "row":
+                        if row_ip is not None or row_reason is not None:
+                            acc.add(row_ip, row_reason)
+                            if timeline is not None:
+                                timeline.add(row_time, row_ip, row_user)
+                        row_ip = row_reason = row_time = row_user = None
+                        elem.clear()
+                        continue
+                    if elem.tag != XLSX_NS + "c":
+                        continue
+                    
+                    ref = elem.get("r")
+                    m = CELL_REF_RE.match(ref) if ref else None
+                    if not m:
+                        raise UnexpectedLayoutError("celda sin referencia")
+                    col, row_idx = m.group(1), int(m.group(2))
+                    
+                    if col == "A" and row_idx <= HEADER_ROWS:
+                        value = self._xlsx_cell_value(elem, shared)
+                        if value:
+                            header_lines.append(value)
+                    elif row_idx >= 12:
+                        last_row = max(last_row, row_idx)
+                        if col == "B":
+                            row_ip = self._xlsx_cell_value(elem, shared)
+                        elif col == "G":
+                            row_reason = self._xlsx_cell_value(elem, shared)
+                        elif timeline is not None and col == "A":
+                            row_time = self._xlsx_cell_value(elem, shared)
+                        elif timeline is not None and col == "E":
+                            row_user = self._xlsx_cell_value(elem, shared)
+            stats['parse'] = time.perf_counter() - start
+        
+        # Filas con datos: la última fila menos las 11 de cabecera, como en openpyxl
+        stats['rows'] = last_row - 11 if last_row else 0
+        return header_lines, acc
+
+    @staticmethod
+    def _read_shared_strings(f, limit=None):
+        """Devuelve la tabla de cadenas compartidas de un .xlsx como lista (solo las `limit` primeras)."""
+        import xml.etree.ElementTree as ET
+        
+        shared = []
+        for _, elem in ET.iterparse(f):
+            if elem.tag == XLSX_NS + "si":
+                # Texto simple (<t>) o texto enriquecido (<r><t>), sin la guía fonética (<rPh>)
+                parts = []
+                for child in elem:
+                    if child.tag == XLSX_NS + "t":
+                        parts.append(child.text or "")
+                    elif child.tag == XLSX_NS + "r":
+                        t = child.find(XLSX_NS + "t")
+                        parts.append(t.text or "" if t is not None else "")
+                shared.append("".join(parts))
+                elem.clear()
+                if limit is not None and len(shared) >= limit:
+                    break
+        return shared
+
+    @staticmethod
+    def _xlsx_cell_value(elem, shared):
+        """Convierte una celda <c> en texto, con la misma representación que openpyxl."""
+        cell_type = elem.get("t", "n")
+        if cell_type == "inlineStr":
+            return "".join(t.text or "" for t in elem.iter(XLSX_NS + "t"))
+        
+        v = elem.find(XLSX_NS + "v")
+        if v is None or v.text is None:
+            return None
+        if cell_type == "s":
+            return shared[int(v.text)]
+        if cell_type in ("str", "d", "e"):
+            return v.text
+        if cell_type == "b":
+            return str(v.text == "1")
+        if "." in v.text or "E" in v.text or "e" in v.text:
+            return str(float(v.text))
+        return str(int(v.text))
+
+    def _process_csv_file(self, path, stats, details, stream=None):
+        """
+        Procesa un archivo CSV para extraer datos.
+        Solo se conservan las columnas de IP y razón, leídas por bloques con el módulo csv
+        (sin pandas), acumulando los valores únicos o los conteos de cada bloque.
+        Si el archivo empieza con líneas de metadatos (Domain Name : ..., etc.), se usan
+        como cabecera y la tabla empieza en la línea siguiente.
+        Si se pasa `stream` (un archivo binario), se lee de él en lugar de `path`.
+        """
+        try:
+            start = time.perf_counter()
+            if stream is None:
+                f = open(path, newline='', encoding='utf-8-sig')
+            else:
+                f = io.TextIOWrapper(stream, newline='', encoding='utf-8-sig')
+            with f:
+                preamble, lines = self._split_csv_preamble(f)
+                header = self._parse_header_lines(preamble)
+                reader = csv.reader(lines)
+                # Asumimos que la primera fila tras los metadatos es el encabezado de la tabla
+                # y que las IPs están en la columna 2 (índice 1) y las razones en la 7 (índice 6)
+                columns = next(reader, [])
+                stats['open'] = time.perf_counter() - start
                 
-                if df.shape[1] > 6:
-                    reasons = pd.Series(df.iloc[:, 6].dropna().astype(str)).unique().tolist()
-                    reasons.sort()
+                # Las columnas se leen por nombre si existen, si no por indice.
+                if 'Client IP' in columns and 'Reason' in columns:
+                    ip_pos, reason_pos = columns.index('Client IP'), columns.index('Reason')
+                else: # Fallback a indices si las columnas no tienen nombre
+                    ip_pos = 1 if len(columns) > 1 else None
+                    reason_pos = 6 if len(columns) > 6 else None
+                
+                acc = self._new_accumulator(CSV_NA_VALUES, self.csv_chunksize)
+                timeline = self._new_timeline(details, CSV_NA_VALUES)
+                # Hora del evento y usuario, para la detección de ráfagas
+                time_pos = columns.index('Logon Time') if 'Logon Time' in columns else 0
+                user_pos = columns.index('User Name') if 'User Name' in columns else 4
+                ip_end = ip_pos + 1 if ip_pos is not None else 0
+                reason_end = reason_pos + 1 if reason_pos is not None else 0
+                
+                start = time.perf_counter()
+                if ip_end or reason_end:
+                    while True:
+                        block = list(islice(reader, self.csv_chunksize))
+                        if not block:
+                            break
+                        # Se descartan las líneas vacías y las que tienen más campos que el encabezado
+                        block = [row for row in block if row and len(row) <= len(columns)]
+                        acc.add_many(
+                            (row[ip_pos] if len(row) >= ip_end > 0 else None,
+                             row[reason_pos] if len(row) >= reason_end > 0 else None)
+                            for row in block
+                        )
+                        if timeline is not None:
+                            for row in block:
+                                timeline.add(row[time_pos] if len(row) > time_pos else None,
+                                             row[ip_pos] if len(row) >= ip_end > 0 else None,
+                                             row[user_pos] if len(row) > user_pos else None)
+                stats['parse'] = time.perf_counter() - start
 
-            return header, reasons, ips
+            start = time.perf_counter()
+            ips, reasons = self._accumulator_result(acc, details)
+            stats['rows'] = acc.rows
+            result = header, sorted(reasons), sort_ips(ips)
+            stats['unique'] = time.perf_counter() - start
+            return result
+        except MemoryError:
+            raise
         except Exception as e:
             logging.error(f"Error al procesar el archivo CSV {path}: {e}")
             return {}, [], []
 
-    def generate_intermediate_report(self, filename, header, reasons, ips):
-        """Genera un informe intermedio en formato de texto."""
-        base = os.path.basename(filename)
-        name, _ = os.path.splitext(base)
-        out_path = os.path.join(self.temp_dir, f"{name}_reporte.txt")
+    def render_intermediate_report(self, header, reasons, ips, counts=None, bursts=None, burst_params=None):
+        """
+        Devuelve el texto del informe intermedio a partir de los datos extraídos.
+        Con `counts`, las razones, las IPs y los pares (IP, razón) se ordenan por número
+        de eventos; con `bursts` se añaden las ráfagas detectadas (`burst_params` indica
+        sus parámetros si no son los del procesador). top_n limita la longitud de cada lista.
+        """
+        lines = ["=" * 50, "", "=== Encabezado ==="]
+        for k in self.header_fields:
+            lines.append(f"{k}: {header.get(k, '<no encontrado>')}")
+        lines.append("")
+        lines.append("=== Razones de Fallo Únicas ===")
+        if counts is not None:
+            # sorted es estable: a igual número de eventos se mantiene el orden original
+            reasons = sorted(reasons, key=lambda r: -counts['reasons'].get(r, 0))
+            lines.extend(self._top_lines(
+                [f"- {fr} ({counts['reasons'].get(fr, 0)} eventos)" for fr in reasons], "razones"))
+        else:
+            lines.extend(self._top_lines([f"- {fr}" for fr in reasons], "razones"))
+        lines.append("")
+        lines.append("=== IPs de Clientes Únicas ===")
+        if counts is not None:
+            ips = sorted(ips, key=lambda ip: -counts['ips'].get(ip, 0))
+            lines.extend(self._top_lines(
+                [f"- {ip} ({counts['ips'].get(ip, 0)} eventos)" for ip in ips], "IPs"))
+            lines.append("")
+            lines.append("=== Eventos por IP y Razón ===")
+            pairs = counts['pairs'].most_common(self.top_n)
+            lines.extend(f"- {ip} / {fr}: {n}" for (ip, fr), n in pairs)
+            if self.top_n and len(counts['pairs']) > self.top_n:
+                lines.append(f"... y {len(counts['pairs']) - self.top_n} combinaciones más")
+        else:
+            if self.collapse_cidr:
+                ips = collapse_ips(ips)
+            lines.extend(self._top_lines([f"- {ip}" for ip in ips], "IPs"))
+        if bursts is not None:
+            lines.append("")
+            lines.extend(self._render_bursts(bursts, burst_params))
+        return "\n".join(lines) + "\n"
+
+    def _render_bursts(self, bursts, params=None):
+        """
+        Devuelve las líneas de la sección de ráfagas por IP y por cuenta. `params`
+        ([umbral, ventana]) son los de la detección si no son los del procesador.
+        """
+        threshold, window = params or self._burst_params()
+        lines = [f"=== Ráfagas de Fallos (más de {threshold} en {window:g} min) ==="]
+        for kind, label in (('ip', "IP"), ('account', "Cuenta")):
+            lines.extend(self._top_lines([
+                f"- {label} {b['key']}: {b['events']} fallos entre {b['start']} y {b['end']}"
+                f" (máx. {b['peak']} en una ventana)"
+                for b in bursts.get(kind, [])
+            ], "ráfagas"))
+        if len(lines) == 1:
+            lines.append("- Sin ráfagas detectadas")
+        return lines
+
+    def _top_lines(self, lines, label):
+        """Limita una lista del reporte a top_n elementos, indicando cuántos se omiten."""
+        if not self.top_n or len(lines) <= self.top_n:
+            return lines
+        return lines[:self.top_n] + [f"... y {len(lines) - self.top_n} {label} más"]
+
+    def render_final_report(self, report_content, header=None, reasons=None, counts=None):
+        """
+        Combina el contenido intermedio con el encabezado y el pie de mensaje según la
+        categoría de las razones de fallo. Sin datos, se toman del propio contenido.
+        """
+        category = None
+        if header is None or reasons is None:
+            header, reasons, counts = self._parse_intermediate_report(report_content)
+            # La sección de categoría solo sirve para elegir el pie y no pasa al reporte final
+            marker = report_content.find("\n" + CATEGORY_SECTION + "\n")
+            if marker != -1:
+                category = report_content[marker:].split("\n- ", 1)[-1].strip()
+                report_content = report_content[:marker]
+        return self.templates.render(report_content, header, reasons, counts, category)
+
+    def _parse_intermediate_report(self, content):
+        """Recupera la cabecera, las razones y sus conteos del texto de un informe intermedio."""
+        header, reasons, reason_counts = {}, [], Counter()
+        section = None
+        for line in content.splitlines():
+            if line.startswith("=== ") and line.endswith(" ==="):
+                section = line[4:-4]
+            elif section == "Encabezado" and ": " in line:
+                key, value = line.split(": ", 1)
+                if value != "<no encontrado>":
+                    header[key] = value
+            elif section == "Razones de Fallo Únicas" and line.startswith("- "):
+                m = REASON_LINE_RE.match(line[2:])
+                reasons.append(m.group(1))
+                if m.group(2):
+                    reason_counts[m.group(1)] = int(m.group(2))
+        return header, reasons, {'reasons': reason_counts} if reason_counts else None
+
+    def generate_intermediate_report(self, filename, header, reasons, ips, counts=None, bursts=None):
+        """Genera un informe intermedio en formato de texto (nombrado según report_name)."""
+        out_path = os.path.join(self.temp_dir, f"{report_name(filename)}_reporte.txt")
         
         try:
-            with open(out_path, "w", encoding="utf-8") as f:
-                f.write("="*50 + "\n\n")
-                f.write("=== Encabezado ===\n")
-                for k in self.header_fields:
-                    f.write(f"{k}: {header.get(k, '<no encontrado>')}\n")
-                f.write("\n=== Razones de Fallo Únicas ===\n")
-                for fr in reasons:
-                    f.write(f"- {fr}\n")
-                f.write("\n=== IPs de Clientes Únicas ===\n")
-                for ip in ips:
-                    f.write(f"- {ip}\n")
-            
-            logging.info(f"Reporte intermedio generado: {out_path}")
+            text = self.render_intermediate_report(header, reasons, ips, counts, bursts)
+            text += f"\n{CATEGORY_SECTION}\n- {self.templates.category(reasons, counts)}\n"
+            self._write_report(out_path, text, filename, "Reporte intermedio")
             return out_path
         except Exception as e:
             logging.error(f"Error al generar el reporte para {filename}: {e}")
             return None
 
-    def generate_final_report(self, intermediate_path):
-        """Genera el informe final combinando el contenido intermedio con mensajes predefinidos."""
+    def generate_final_report(self, intermediate_path, label=None):
+        """
+        Genera el informe final combinando el contenido intermedio con mensajes predefinidos.
+        `label` identifica el archivo de origen en las métricas de escritura.
+        """
         try:
             with open(intermediate_path, "r", encoding="utf-8") as f:
                 report_content = f.read()
             
-            combined = self.message_header + report_content + "\n" + self.message_footer
+            combined = self.render_final_report(report_content)
             
             base = os.path.splitext(os.path.basename(intermediate_path))[0]
             out_fname = f"{base}_final.txt"
             out_path = os.path.join(self.output_dir, out_fname)
             
-            with open(out_path, "w", encoding="utf-8") as f:
-                f.write(combined)
-            
-            logging.info(f"Reporte final generado: {out_path}")
+            self._write_report(out_path, combined, label or os.path.basename(intermediate_path))
             return out_path
         except Exception as e:
             logging.error(f"Error al generar el reporte final: {e}")
             return None
 
-    def extract_intermediate_reports(self):
+    def generate_final_report_from_data(self, filename, header, reasons, ips, name=None,
+                                        counts=None, bursts=None):
         """
-        Procesa todos los archivos de origen y genera solo los reportes intermedios.
-        Devuelve listas de archivos procesados y fallidos.
+        Genera el informe final directamente a partir de los datos extraídos,
+        sin pasar por el informe intermedio en disco. Por defecto el reporte
+        toma el nombre del origen (ver report_name); `name` permite indicar otro.
         """
-        processed_files = []
-        failed_files = []
+        if name is None:
+            name = report_name(filename)
+        out_path = os.path.join(self.output_dir, f"{name}_reporte_final.txt")
         
+        try:
+            combined = self.render_final_report(
+                self.render_intermediate_report(header, reasons, ips, counts, bursts), header, reasons, counts)
+            self._write_report(out_path, combined, filename)
+            return out_path
+        except Exception as e:
+            logging.error(f"Error al generar el reporte final para {filename}: {e}")
+            return None
+
+    def _write_report(self, out_path, text, label=None, description="Reporte final"):
+        """
+        Escribe un reporte con un nombre temporal y lo renombra al terminar. Con
+        writer_threads la escritura se encola en el pool de hilos y los errores se
+        conocen al esperar a las escrituras pendientes (_flush_writes).
+        """
+        if not self.writer_threads:
+            write_atomic(out_path, text)
+            logging.info(f"{description} generado: {out_path}")
+            return
+        if self._writer is None:
+            self._writer = ReportWriter(self.writer_threads)
+        self._writer.submit(out_path, text, label, description)
+
+    def _flush_writes(self):
+        """
+        Espera a que terminen las escrituras en segundo plano y suma su tiempo a las
+        métricas. Devuelve {ruta: archivo de origen} de los reportes que no se escribieron.
+        """
+        if self._writer is None:
+            return {}
+        failed = {}
+        for label, path, seconds, error in self._writer.flush():
+            if source_file(label) in self.metrics['files']:
+                self._record_write(label, seconds)
+            if error is not None:
+                failed[path] = label
+        return failed
+
+    def close_writer(self):
+        """Espera a las escrituras pendientes y detiene el pool de escritura."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def cancel(self):
+        """
+        Pide detener la ejecución en curso: los archivos pendientes se marcan como
+        cancelados y, con aislamiento, los que se están leyendo se detienen al momento.
+        La petición sigue activa hasta reset_cancel().
+        """
+        self.cancel_event.set()
+
+    def reset_cancel(self):
+        """Anula una cancelación anterior para poder lanzar otra ejecución."""
+        self.cancel_event.clear()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def _file_failed(self, filename, error):
+        """Registra el fallo de lectura de un archivo con su motivo y lo notifica."""
+        self.metrics['files'].setdefault(filename, {})['error'] = error
+        if error == CANCELLED:
+            logging.warning(f"Cancelado: {filename}")
+            self._emit('cancelled', filename, error=error)
+        else:
+            logging.error(f"Error al procesar {filename}: {error}")
+            self._emit('failed', filename, error=error)
+
+    def _emit(self, event, filename=None, **data):
+        """
+        Envía un evento de progreso al callback `progress`, si lo hay. Los eventos son
+        'batch' (inicio de una etapa, con el total de archivos), 'started', 'parsed',
+        'written', 'failed' y 'cancelled', con los tiempos y contadores disponibles.
+        """
+        if self.progress is None:
+            return
+        try:
+            self.progress({'event': event, 'file': filename, 'time': time.time(), **data})
+        except Exception as e:
+            logging.warning(f"Error al notificar el progreso: {e}")
+
+    def _emit_parsed(self, filename, result, stats):
+        """Notifica el fin de la lectura de un archivo con sus tiempos y filas."""
+        if result is None:
+            self._emit('failed', filename, error="No se pudo leer el archivo")
+            return
+        self._emit('parsed', filename, rows=stats.get('rows', 0),
+                   seconds=sum(stats.get(stage, 0.0) for stage in ('open', 'parse', 'unique', 'bursts')))
+
+    def _open_store(self):
+        """Abre el almacén de resultados (si está configurado) y la transacción del lote."""
+        if self.store_path is None:
+            return
+        self._get_store().begin()
+
+    def _store_result(self, filename, header, reasons, ips, details):
+        """Guarda en el almacén los datos extraídos de un archivo."""
+        if self.store is None:
+            return
+        try:
+            self.store.add(filename, header, reasons, ips, details.get('counts'), details.get('bursts'),
+                           self._burst_params() if 'bursts' in details else None)
+        except Exception as e:
+            logging.error(f"Error al guardar {filename} en el almacén de resultados: {e}")
+
+    def _commit_store(self):
+        """Confirma en el almacén los resultados del lote."""
+        if self.store is None:
+            return
+        try:
+            self.store.commit()
+            if self._history is not None:
+                self._history.clear_cache()
+            logging.info(f"Resultados guardados en {self.store_path}")
+        except Exception as e:
+            logging.error(f"Error al guardar el almacén de resultados: {e}")
+
+    def _get_store(self):
+        """Devuelve el almacén de resultados, abriéndolo si hace falta."""
+        if self.store is None:
+            self.store = ResultsStore(self.store_path)
+        return self.store
+
+    def history(self):
+        """Devuelve la API de consultas sobre el historial del almacén de resultados."""
+        if self._history is None:
+            self._history = ResultsHistory(self._get_store())
+        return self._history
+
+    def render_stored_report(self, filename):
+        """Devuelve el texto del reporte final de un archivo guardado en el almacén, o None."""
+        stored = self._get_store().load(filename)
+        if stored is None:
+            return None
+        header, reasons, ips, details = stored
+        counts = details.get('counts')
+        return self.render_final_report(self.render_intermediate_report(
+            header, reasons, ips, counts, details.get('bursts'), details.get('burst_params')),
+            header, reasons, counts)
+
+    def _start_batch_index(self):
+        """Prepara un índice vacío para el lote si la agregación está activa."""
+        self.batch_index = BatchIndex() if self.aggregate else None
+        self.summary_path = None
+
+    def generate_summary_report(self):
+        """Escribe el reporte consolidado del lote con las IPs ordenadas por alcance."""
+        if self.batch_index is None or not self.batch_index.files:
+            return None
+        
+        out_path = os.path.join(self.output_dir, "resumen_consolidado.txt")
+        try:
+            write_atomic(out_path, self.batch_index.render_summary(self.summary_top))
+            logging.info(f"Reporte consolidado generado: {out_path}")
+            self.summary_path = out_path
+            return out_path
+        except Exception as e:
+            logging.error(f"Error al generar el reporte consolidado: {e}")
+            return None
+
+    def _list_source_files(self, files=None):
+        """
+        Devuelve los archivos de origen soportados de input_dir, o None si no existe.
+        Si se pasa `files`, solo se consideran esos nombres de archivo.
+        """
         if not os.path.exists(self.input_dir):
             logging.error(f"El directorio de entrada {self.input_dir} no existe.")
-            return processed_files, failed_files
+            return None
         
-        source_files = [f for f in os.listdir(self.input_dir) if f.lower().endswith(('.xls', '.xlsx', '.csv'))]
+        if files is None:
+            files = os.listdir(self.input_dir)
+        source_files = [f for f in files if f.lower().endswith(SOURCE_EXTENSIONS)]
         
         if not source_files:
             logging.warning(f"No se encontraron archivos Excel o CSV en {self.input_dir}")
+        return source_files
+
+    def scan_inventory(self, files=None):
+        """
+        Actualiza y devuelve el inventario de input_dir (o solo de `files`) leyendo solo
+        la cabecera de cada archivo. Los archivos sin cambios desde el último inventario
+        no se vuelven a leer (salvo con force_rebuild). Las cabeceras se leen en un pool
+        de hilos, o de procesos con parallel.
+        """
+        inventory = Inventory(self.inventory_path)
+        source_files = self._list_source_files(files)
+        if source_files is None:
+            return inventory
+        if files is None:
+            inventory.prune(source_files)
+        
+        pending = []
+        for filename in source_files:
+            try:
+                st = os.stat(os.path.join(self.input_dir, filename))
+            except OSError as e:
+                logging.error(f"Error al acceder a {filename}: {e}")
+                continue
+            if self.force_rebuild or inventory.lookup(filename, st) is None:
+                pending.append((filename, st))
+        
+        if pending:
+            logging.info(f"Leyendo la cabecera de {len(pending)} de {len(source_files)} archivos...")
+            paths = [os.path.join(self.input_dir, filename) for filename, _ in pending]
+            workers = min(self.max_workers, len(pending))
+            if self.parallel and workers > 1:
+                from concurrent.futures import ProcessPoolExecutor as Executor
+            else:
+                # La lectura de unas pocas filas es sobre todo espera de E/S
+                from concurrent.futures import ThreadPoolExecutor as Executor
+            with Executor(max_workers=workers) as executor:
+                headers = executor.map(self.extract_header, paths,
+                                       chunksize=max(1, len(paths) // (workers * 4)))
+                for (filename, st), header in zip(pending, headers):
+                    inventory.update(filename, header, st)
+        
+        inventory.save()
+        return inventory
+
+    def extract_intermediate_reports(self, files=None):
+        """
+        Procesa todos los archivos de origen (o solo `files`) y genera solo los reportes intermedios.
+        Devuelve listas de archivos procesados y fallidos.
+        """
+        processed_files = []
+        failed_files = []
+        
+        self.metrics = {'files': {}}
+        self.file_details = {}
+        self.bursts = {}
+        self.report_sources = {}
+        self._start_batch_index()
+        self._open_store()
+        source_files = self._list_source_files(files)
+        if not source_files:
             return processed_files, failed_files
         
         logging.info(f"Extrayendo información de {len(source_files)} archivos...")
+        self._emit('batch', stage='intermediate', total=len(source_files))
         
-        for filename in source_files:
-            file_path = os.path.join(self.input_dir, filename)
-            logging.info(f"Procesando: {filename}")
+        for filename, result in self._iter_processed_files(source_files):
+            if result is None:
+                failed_files.append(filename)
+                continue
             
             try:
-                header, reasons, ips = self.process_file(file_path)
-                intermediate_path = self.generate_intermediate_report(file_path, header, reasons, ips)
+                header, reasons, ips = result
+                start = time.perf_counter()
+                details = self._take_details(filename)
+                if self.batch_index is not None:
+                    self.batch_index.add(filename, header, ips, details.get('pairs', ()))
+                self._store_result(filename, header, reasons, ips, details)
+                intermediate_path = self.generate_intermediate_report(
+                    filename, header, reasons, ips, details.get('counts'), details.get('bursts'))
+                seconds = time.perf_counter() - start
+                self._record_write(filename, seconds)
                 
                 if intermediate_path:
+                    self.report_sources[os.path.basename(intermediate_path)] = filename
                     processed_files.append(filename)
                     logging.info(f"✓ Información extraída de {filename}")
+                    self._emit('written', filename, stage='intermediate', seconds=seconds)
                 else:
                     failed_files.append(filename)
+                    self._emit('failed', filename, error="No se pudo escribir el reporte intermedio")
                     
             except Exception as e:
                 logging.error(f"Error al procesar {filename}: {e}")
                 failed_files.append(filename)
+                self._emit('failed', filename, error=str(e))
+        
+        # Los reportes intermedios deben estar en disco antes de la segunda etapa
+        lost = set(self._flush_writes().values())
+        if lost:
+            processed_files = [f for f in processed_files if f not in lost]
+            failed_files.extend(sorted(lost))
+            for filename in lost:
+                self._emit('failed', filename, error="No se pudo escribir el reporte intermedio")
         
+        self._commit_store()
+        self.generate_summary_report()
         return processed_files, failed_files
 
+    def generate_reports_in_memory(self, files=None):
+        """
+        Procesa todos los archivos de origen (o solo `files`) y genera directamente los reportes finales,
+        sin escribir ni volver a leer los reportes intermedios.
+        Devuelve la lista de reportes finales generados y la de archivos fallidos.
+        """
+        processed_final = []
+        failed_files = []
+        
+        self.metrics = {'files': {}}
+        self.file_details = {}
+        self.bursts = {}
+        self._start_batch_index()
+        self._open_store()
+        source_files = self._list_source_files(files)
+        if not source_files:
+            return processed_final, failed_files
+        
+        logging.info(f"Generando reportes finales de {len(source_files)} archivos...")
+        self._emit('batch', stage='final', total=len(source_files))
+        
+        for filename, result in self._iter_processed_files(source_files):
+            if result is None:
+                failed_files.append(filename)
+                continue
+            
+            header, reasons, ips = result
+            details = self._take_details(filename)
+            if self.batch_index is not None:
+                self.batch_index.add(filename, header, ips, details.get('pairs', ()))
+            self._store_result(filename, header, reasons, ips, details)
+            if self.store_only:
+                # Los reportes de texto se generan después bajo demanda desde el almacén
+                processed_final.append(filename)
+                self._emit('written', filename, stage='store', seconds=0.0)
+                continue
+            start = time.perf_counter()
+            final_path = self.generate_final_report_from_data(
+                filename, header, reasons, ips, counts=details.get('counts'), bursts=details.get('bursts'))
+            seconds = time.perf_counter() - start
+            self._record_write(filename, seconds)
+            if final_path:
+                processed_final.append(final_path)
+                self._emit('written', filename, stage='final', seconds=seconds)
+            else:
+                failed_files.append(filename)
+                self._emit('failed', filename, error="No se pudo escribir el reporte final")
+        
+        failed_writes = self._flush_writes()
+        if failed_writes:
+            processed_final = [p for p in processed_final if p not in failed_writes]
+            failed_files.extend(failed_writes.values())
+            for filename in failed_writes.values():
+                self._emit('failed', filename, error="No se pudo escribir el reporte final")
+        
+        self._commit_store()
+        self.generate_summary_report()
+        return processed_final, failed_files
+
+    def generate_account_reports(self, files=None):
+        """
+        Procesa todos los archivos de origen (o solo `files`) y genera un único reporte
+        final por cuenta (Object Name(s)) y dominio, uniendo razones, IPs y periodos de
+        todas sus exportaciones. Los grupos se van completando a medida que termina cada archivo.
+        Con `files` (una tanda de --watch o los archivos que cumplen los filtros de --cli),
+        cada grupo que toca la tanda se rehace con todas sus exportaciones de input_dir;
+        las que no cambiaron salen del manifiesto. Los archivos cuya cabecera no indica la
+        cuenta no se agrupan: tienen su propio reporte.
+        Devuelve la lista de reportes finales generados y la de archivos fallidos.
+        """
+        processed_final = []
+        failed_files = []
+        
+        self.metrics = {'files': {}}
+        self.file_details = {}
+        self.bursts = {}
+        self._start_batch_index()
+        self._open_store()
+        source_files = self._list_source_files(files)
+        if not source_files:
+            return processed_final, failed_files
+        batch = set(source_files)
+        others = []
+        if files is not None:
+            others = [f for f in self._list_source_files() or [] if f not in batch]
+        
+        logging.info(f"Agrupando por cuenta {len(source_files)} archivos...")
+        self._emit('batch', stage='final', total=len(source_files))
+        
+        groups = AccountGroups()
+        touched = set()
+        ungrouped = []
+        for filename, result in self._iter_processed_files(source_files + others):
+            in_batch = source_file(filename) in batch
+            if result is None:
+                if in_batch:
+                    failed_files.append(filename)
+                continue
+            
+            header, reasons, ips = result
+            details = self._take_details(filename)
+            key = account_key(header)
+            if not in_batch:
+                # Exportación de otra tanda: solo completa los grupos de la tanda actual
+                if key is not None:
+                    groups.add(filename, header, reasons, ips, details)
+                continue
+            self._store_result(filename, header, reasons, ips, details)
+            if key is None:
+                ungrouped.append((filename, header, reasons, ips, details))
+            else:
+                groups.add(filename, header, reasons, ips, details)
+                touched.add(key)
+            if self.batch_index is not None:
+                self.batch_index.add(filename, header, ips, details.get('pairs', ()))
+        
+        logging.info(f"Generando {len(touched)} reportes finales por cuenta...")
+        
+        report_sources = {}
+        for account, domain, sources, header, reasons, ips, details in groups.items():
+            if (account, domain) not in touched:
+                continue
+            name = re.sub(r"[^\w.-]+", "_", f"{account}_{domain}" if domain else account).strip("_")
+            final_path = self.generate_final_report_from_data(
+                account, header, reasons, ips, name=name,
+                counts=details.get('counts'), bursts=details.get('bursts'))
+            written = [source for source in sources if source_file(source) in batch]
+            if final_path:
+                processed_final.append(final_path)
+                report_sources[final_path] = written
+                logging.info(f"✓ {account} ({domain}): {len(sources)} archivo(s) consolidados")
+                for source in written:
+                    self._emit('written', source, stage='final', account=account)
+            else:
+                failed_files.extend(written)
+                for source in written:
+                    self._emit('failed', source, error="No se pudo escribir el reporte de la cuenta")
+        
+        for filename, header, reasons, ips, details in ungrouped:
+            final_path = self.generate_final_report_from_data(
+                filename, header, reasons, ips, counts=details.get('counts'), bursts=details.get('bursts'))
+            if final_path:
+                processed_final.append(final_path)
+                report_sources[final_path] = [filename]
+                logging.info(f"✓ {filename}: sin cuenta en la cabecera, reporte propio")
+                self._emit('written', filename, stage='final')
+            else:
+                failed_files.append(filename)
+                self._emit('failed', filename, error="No se pudo escribir el reporte final")
+        
+        for path in self._flush_writes():
+            processed_final.remove(path)
+            failed_files.extend(report_sources[path])
+            for source in report_sources[path]:
+                self._emit('failed', source, error="No se pudo escribir el reporte de la cuenta")
+        
+        self._commit_store()
+        self.generate_summary_report()
+        return processed_final, failed_files
+
+    def _iter_processed_files(self, source_files):
+        """
+        Procesa los archivos de origen y devuelve (origen, resultado) a medida que terminan.
+        El resultado es None si el archivo falló; un comprimido da un resultado por cada
+        exportación que contiene (ver _iter_sources). Con el manifiesto activo, los
+        archivos sin cambios se sirven desde él sin volver a leerlos.
+        """
+        if not self.use_manifest:
+            for filename, result in self._iter_parsed_files(source_files):
+                yield from self._iter_sources(filename, result)
+            return
+        
+        manifest = ExtractionManifest(self.manifest_path, use_hash=self.manifest_hash)
+        
+        pending = []
+        fingerprints = {}
+        try:
+            for filename in source_files:
+                file_path = os.path.join(self.input_dir, filename)
+                try:
+                    # Con force_rebuild se vuelve a leer todo y se actualiza el manifiesto
+                    cached = None if self.force_rebuild else self._cached_result(manifest, file_path)
+                    fingerprints[filename] = os.stat(file_path)
+                except OSError as e:
+                    logging.error(f"Error al acceder a {filename}: {e}")
+                    self.metrics['files'][filename] = {'error': str(e)}
+                    self._emit('failed', filename, error=str(e))
+                    yield filename, None
+                    continue
+                if cached is not None:
+                    result, details = cached
+                    if details:
+                        self.file_details[filename] = details
+                    logging.info(f"Sin cambios, se usa el manifiesto: {filename}")
+                    self.metrics['files'][filename] = {'cached': True}
+                    self._emit('parsed', filename, cached=True)
+                    yield from self._iter_sources(filename, result)
+                else:
+                    pending.append(filename)
+            
+            for filename, result in self._iter_parsed_files(pending):
+                file_path = os.path.join(self.input_dir, filename)
+                # Un resultado vacío puede deberse a un error de lectura: no se guarda
+                if isinstance(result, list):
+                    if result and all(any(member_result) for _, member_result, _ in result):
+                        manifest.store_members(file_path, result, st=fingerprints[filename],
+                                               burst_params=self._burst_params())
+                elif result is not None and any(result):
+                    header, reasons, ips = result
+                    details = self.file_details.get(filename, {})
+                    manifest.store(file_path, header, reasons, ips,
+                                   st=fingerprints[filename], counts=details.get('counts'),
+                                   bursts=details.get('bursts'), burst_params=self._burst_params(),
+                                   pairs=details.get('pairs'))
+                yield from self._iter_sources(filename, result)
+        finally:
+            manifest.save()
+
+    def _iter_sources(self, filename, result):
+        """
+        Devuelve (origen, resultado) de un archivo leído: el propio archivo o, en un
+        comprimido, cada exportación que contiene como "<comprimido>/<miembro>", con sus
+        datos adicionales en file_details. Un comprimido sin exportaciones da un resultado vacío.
+        """
+        if not isinstance(result, list):
+            yield filename, result
+            return
+        if not result:
+            yield filename, ({}, [], [])
+            return
+        for member, member_result, details in result:
+            source = f"{filename}/{member}"
+            if details:
+                self.file_details[source] = details
+            yield source, tuple(member_result)
+
+    def _cached_result(self, manifest, file_path):
+        """
+        Devuelve (resultado, detalles) de un archivo sin cambios guardado en el manifiesto,
+        o None si cambió o le falta alguno de los datos activados. En un comprimido, el
+        resultado es la lista de sus exportaciones, cada una con sus detalles.
+        """
+        if is_archive(file_path):
+            members = manifest.lookup_members(file_path)
+            if members is None:
+                return None
+            result = []
+            for member in members:
+                details = self._cached_details(manifest, file_path, member)
+                if details is None:
+                    return None
+                result.append((member, manifest.lookup(file_path, member), details))
+            return result, {}
+        
+        cached = manifest.lookup(file_path)
+        if cached is None:
+            return None
+        # Los conteos y ráfagas activados también deben estar en el manifiesto
+        details = self._cached_details(manifest, file_path)
+        if details is None:
+            return None
+        return cached, details
+
+    def _burst_params(self):
+        """Parámetros de la detección de ráfagas, o None si no está activa."""
+        if self.burst_threshold is None:
+            return None
+        return [self.burst_threshold, self.burst_window]
+
+    def _cached_details(self, manifest, file_path, member=None):
+        """
+        Devuelve los datos adicionales de un archivo (o de una exportación de un
+        comprimido) guardados en el manifiesto, o None si falta alguno de los activados
+        (conteos, ráfagas con los mismos parámetros o pares (IP, razón) del resumen).
+        """
+        details = {}
+        if self.aggregate:
+            details['pairs'] = manifest.cached_pairs(file_path, member)
+            if details['pairs'] is None:
+                return None
+        if self.count_events:
+            details['counts'] = manifest.cached_counts(file_path, member)
+            if details['counts'] is None:
+                return None
+        if self.burst_threshold is not None:
+            details['bursts'] = manifest.cached_bursts(file_path, self._burst_params(), member)
+            if details['bursts'] is None:
+                return None
+        return details
+
+    def _take_details(self, filename):
+        """Retira los datos adicionales de un archivo y anota sus ráfagas para el resultado de run()."""
+        details = self.file_details.pop(filename, {})
+        if 'bursts' in details:
+            self.bursts[filename] = details['bursts']
+        return details
+
+    def _iter_parsed_files(self, source_files):
+        """
+        Lee los archivos de origen, en serie, en un pool de procesos o, con aislamiento,
+        cada uno en su propio proceso. Tras una cancelación, los archivos que faltan se
+        devuelven como fallidos; sin aislamiento, los que ya se están leyendo terminan.
+        """
+        if self.isolate:
+            yield from self._iter_isolated_files(source_files)
+            return
+
+        if not self.parallel or self.max_workers < 2 or len(source_files) < 2:
+            for filename in source_files:
+                if self.cancelled:
+                    self._file_failed(filename, CANCELLED)
+                    yield filename, None
+                    continue
+                logging.info(f"Procesando: {filename}")
+                self._emit('started', filename)
+                stats = {}
+                details = {}
+                try:
+                    result = self.process_file(os.path.join(self.input_dir, filename), stats, details)
+                    self.metrics['files'][filename] = stats
+                    if details:
+                        self.file_details[filename] = details
+                    self._emit_parsed(filename, result, stats)
+                    yield filename, result
+                except Exception as e:
+                    self._file_failed(filename, str(e))
+                    yield filename, None
+            return
+        
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        
+        workers = min(self.max_workers, len(source_files))
+        logging.info(f"Procesando en paralelo con {workers} procesos...")
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for filename in source_files:
+                futures[executor.submit(self._process_file_with_stats,
+                                        os.path.join(self.input_dir, filename))] = filename
+            # El pool toma los archivos en orden: se avisan los `workers` primeros y, cada
+            # vez que uno termina, el siguiente de la cola
+            queued = iter(source_files)
+            started = set()
+
+            def start_next():
+                for filename in queued:
+                    if filename not in started:
+                        started.add(filename)
+                        self._emit('started', filename)
+                        return
+
+            for _ in range(workers):
+                start_next()
+            for future in as_completed(futures):
+                filename = futures[future]
+                if future.cancelled():
+                    self._file_failed(filename, CANCELLED)
+                    yield filename, None
+                    continue
+                if filename not in started:
+                    # Terminó antes de que le tocara el aviso
+                    started.add(filename)
+                    self._emit('started', filename)
+                try:
+                    result, stats, details = future.result()
+                    self.metrics['files'][filename] = stats
+                    if details:
+                        self.file_details[filename] = details
+                    self._emit_parsed(filename, result, stats)
+                    yield filename, result
+                except Exception as e:
+                    # Un fallo del proceso trabajador solo afecta a este archivo
+                    self._file_failed(filename, str(e))
+                    yield filename, None
+                if self.cancelled:
+                    # Los archivos que aún no empezaron ya no se leen
+                    for pending in futures:
+                        pending.cancel()
+                else:
+                    start_next()
+
+    def _iter_isolated_files(self, source_files):
+        """
+        Lee cada archivo en un proceso propio (hasta max_workers a la vez si parallel),
+        con los límites file_timeout y file_memory_mb. El proceso de un archivo que los
+        supera, o que sigue en curso al cancelar, se mata y el archivo se marca fallido.
+        """
+        workers = min(self.max_workers, len(source_files)) if self.parallel else 1
+        runner = IsolatedRunner(max_workers=workers, timeout=self.file_timeout,
+                                memory_mb=self.file_memory_mb, cancel_event=self.cancel_event)
+        logging.info(f"Procesando con aislamiento por archivo ({workers} proceso(s) a la vez)...")
+
+        jobs = [(filename, (os.path.join(self.input_dir, filename),)) for filename in source_files]
+        for filename, value, error in runner.run(self._process_file_with_stats, jobs,
+                                                 lambda filename: self._emit('started', filename)):
+            if error is not None:
+                self._file_failed(filename, error)
+                yield filename, None
+                continue
+            result, stats, details = value
+            self.metrics['files'][filename] = stats
+            if details:
+                self.file_details[filename] = details
+            self._emit_parsed(filename, result, stats)
+            yield filename, result
+
     def generate_final_reports(self):
         """
         Genera los reportes finales a partir de los reportes intermedios existentes.
@@ -249,23 +1599,83 @@ Después de analizar los logon failures del usuario, se pudo comprobar lo siguie
             
         logging.info(f"Generando {len(intermediate_files)} reportes finales...")
         
+        # Relaciona cada reporte intermedio con su origen, para las métricas y los eventos
+        sources = self.report_sources
+        # El total cuenta archivos de origen: un comprimido tiene un reporte por exportación
+        self._emit('batch', stage='final',
+                   total=len({source_file(sources.get(f, f)) for f in intermediate_files}))
+        
         for filename in intermediate_files:
             intermediate_path = os.path.join(self.temp_dir, filename)
+            source = sources.get(filename, filename)
+            if self.cancelled:
+                # Los reportes intermedios que faltan se conservan para otra ejecución
+                failed_final.append(filename)
+                self._emit('cancelled', source, error=CANCELLED)
+                continue
             try:
-                final_path = self.generate_final_report(intermediate_path)
+                start = time.perf_counter()
+                final_path = self.generate_final_report(intermediate_path, sources.get(filename))
+                seconds = time.perf_counter() - start
+                if filename in sources:
+                    self._record_write(sources[filename], seconds)
                 if final_path:
                     processed_final.append(final_path)
+                    self._emit('written', source, stage='final', seconds=seconds)
                 else:
                     failed_final.append(filename)
+                    self._emit('failed', source, error="No se pudo escribir el reporte final")
             except Exception as e:
                 logging.error(f"Error al generar el reporte final para {filename}: {e}")
                 failed_final.append(filename)
+                self._emit('failed', source, error=str(e))
+        
+        failed_writes = self._flush_writes()
+        if failed_writes:
+            processed_final = [p for p in processed_final if p not in failed_writes]
+            failed_final.extend(failed_writes.values())
+            for label in failed_writes.values():
+                self._emit('failed', label, error="No se pudo escribir el reporte final")
                 
         # Limpiar los archivos intermedios después de usarlos
-        self.cleanup_temp_files()
+        if not self.cancelled:
+            self.cleanup_temp_files()
         
         return processed_final, failed_final
 
+    def _record_write(self, filename, seconds):
+        """Acumula el tiempo de escritura de reportes de un origen en las métricas de su archivo."""
+        stats = self.metrics['files'].setdefault(source_file(filename), {})
+        stats['write'] = stats.get('write', 0.0) + seconds
+
+    def summarize_metrics(self):
+        """Devuelve las métricas por archivo y los totales por etapa de la última ejecución."""
+        files = self.metrics['files']
+        totals = {key: 0.0 for key in METRIC_STAGES}
+        totals.update({key: 0 for key in METRIC_COUNTERS})
+        for stats in files.values():
+            for key in totals:
+                totals[key] += stats.get(key, 0)
+        totals['files'] = len(files)
+        totals['cached'] = sum(1 for stats in files.values() if stats.get('cached'))
+        return {'files': files, 'totals': totals}
+
+    def save_metrics(self, results):
+        """Añade las métricas de una ejecución al archivo JSON Lines de métricas."""
+        entry = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'processed': len(results['processed']),
+            'failed': len(results['failed']),
+            'duration': results['duration'].total_seconds(),
+            'metrics': results['metrics'],
+        }
+        try:
+            with open(self.metrics_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            logging.info(f"Métricas guardadas en {self.metrics_path}")
+        except Exception as e:
+            logging.error(f"Error al guardar las métricas: {e}")
+
     def cleanup_temp_files(self):
         """Limpia los archivos temporales generados."""
         try:
@@ -276,17 +1686,37 @@ Después de analizar los logon failures del usuario, se pudo comprobar lo siguie
         except Exception as e:
             logging.error(f"Error durante la limpieza de archivos temporales: {e}")
 
-    def run(self, cleanup=True):
-        """Ejecuta el proceso completo de generación de reportes (flujo original)."""
+    def run(self, cleanup=True, pipeline=False, files=None):
+        """
+        Ejecuta el proceso completo de generación de reportes.
+        Con writer_threads, la ejecución no termina hasta que se escriben todos los reportes.
+        Con store_only los resultados solo se guardan en el almacén SQLite (sin reportes
+        de texto por archivo), siempre en memoria.
+        Con pipeline=True los reportes finales se generan en memoria, sin reportes intermedios;
+        si no, se usa el flujo original en dos etapas. Con group_by_account se genera un
+        reporte por cuenta (siempre en memoria). `files` limita el proceso a esos
+        nombres de archivo de input_dir.
+        """
         start_time = datetime.now()
         logging.info("=== Inicio del procesamiento de reportes ===")
         
-        processed_intermediate, failed_intermediate = self.extract_intermediate_reports()
-        
-        if processed_intermediate:
-            processed_final, failed_final = self.generate_final_reports()
-        else:
-            processed_final, failed_final = [], []
+        try:
+            if self.group_by_account:
+                processed_final, failed_intermediate = self.generate_account_reports(files)
+                failed_final = []
+            elif pipeline or self.store_only:
+                processed_final, failed_intermediate = self.generate_reports_in_memory(files)
+                failed_final = []
+            else:
+                processed_intermediate, failed_intermediate = self.extract_intermediate_reports(files)
+                
+                if processed_intermediate and not self.cancelled:
+                    processed_final, failed_final = self.generate_final_reports()
+                else:
+                    processed_final, failed_final = [], []
+        finally:
+            # Ningún reporte queda a medio escribir al terminar la ejecución
+            self.close_writer()
 
         end_time = datetime.now()
         duration = end_time - start_time
@@ -304,14 +1734,30 @@ Después de analizar los logon failures del usuario, se pudo comprobar lo siguie
         if failed_files_list:
             logging.warning(f"Archivos con errores: {', '.join(set(failed_files_list))}")
         
-        return {
+        metrics = self.summarize_metrics()
+        totals = metrics['totals']
+        logging.info(
+            "Tiempos por etapa: " + ", ".join(f"{k}={totals[k]:.3f}s" for k in METRIC_STAGES)
+            + f" | filas: {totals['rows']} | bytes leídos: {totals['bytes_read']}"
+        )
+        
+        results = {
             'processed': processed_final,
             'failed': failed_files_list,
-            'duration': duration
+            'duration': duration,
+            'metrics': metrics,
+            'summary': self.summary_path,
+            'bursts': self.bursts,
+            'errors': {f: stats['error'] for f, stats in metrics['files'].items() if 'error' in stats},
+            'cancelled': self.cancelled,
         }
+        if self.dump_metrics:
+            self.save_metrics(results)
+        return results
 
 def main():
     """Función principal para ejecución directa."""
+    configure_utf8_stdout()
     processor = ReportProcessor()
     results = processor.run()
     
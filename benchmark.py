@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Banco de pruebas de rendimiento del Generador de Reportes de Seguridad.
+
+Genera exportaciones sintéticas con el formato de ADAudit (.xlsx y .csv) y mide
+el tiempo de process_file, extract_intermediate_reports, generate_final_reports
+y run, mostrando archivos/s, filas/s y el pico de memoria (RSS).
+
+Ejemplo:
+  python benchmark.py --files 20 --rows 50000 --ips 2000 --reasons 5 --format both
+"""
+
+import os
+import sys
+import csv
+import time
+import random
+import shutil
+import logging
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+from openpyxl import Workbook
+
+from automated_reports import ReportProcessor
+
+# Columnas de la tabla de datos (la B es la IP y la G la razón del fallo)
+DATA_COLUMNS = [
+    "Logon Time", "Client IP", "Client Host Name", "Logon Type",
+    "User Name", "Domain Controller", "Reason", "Event ID",
+]
+
+REASONS = [
+    "Bad password", "Account locked out", "Password expired", "Account disabled",
+    "Unknown user name", "Logon outside allowed hours", "Account expired",
+    "User not allowed to logon at this computer",
+]
+
+
+def synthetic_header(index, rows):
+    """Devuelve las 9 líneas de cabecera de una exportación sintética."""
+    return [
+        "Report Name : Logon Failures",
+        "Period : Jan 01, 2025 00:00:00 - Jan 07, 2025 23:59:59",
+        f"Domain Name : DOMAIN{index % 3}.LOCAL",
+        "Annotation : Benchmark",
+        f"Number of Records : {rows}",
+        f"Object Name(s) : user{index:04d}",
+        "Business Hour Setting : 08:00 - 18:00",
+        "Filter : Failure",
+        "Generated At : Jan 08, 2025 06:00:00",
+    ]
+
+
+def synthetic_rows(rng, rows, ips, reasons):
+    """Genera las filas de datos con la cardinalidad de IPs y razones indicada."""
+    ip_pool = [f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}" for i in range(ips)]
+    reason_pool = [REASONS[i % len(REASONS)] + ("" if i < len(REASONS) else f" ({i})") for i in range(reasons)]
+    start = datetime(2025, 1, 1)
+    for i in range(rows):
+        yield [
+            (start + timedelta(seconds=i * 7)).strftime("%Y-%m-%d %H:%M:%S"),
+            rng.choice(ip_pool),
+            f"HOST-{rng.randrange(500):03d}",
+            "Network",
+            "user",
+            "DC01",
+            rng.choice(reason_pool),
+            4625,
+        ]
+
+
+def write_xlsx(path, index, rows, ips, reasons, rng):
+    """Escribe una exportación .xlsx: cabecera en A1:A9, títulos en la fila 11 y datos desde la 12."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    for line in synthetic_header(index, rows):
+        ws.append([line])
+    ws.append([])
+    ws.append(DATA_COLUMNS)
+    for row in synthetic_rows(rng, rows, ips, reasons):
+        ws.append(row)
+    wb.save(path)
+
+
+def write_csv(path, rows, ips, reasons, rng):
+    """Escribe una exportación .csv con fila de títulos."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(DATA_COLUMNS)
+        writer.writerows(synthetic_rows(rng, rows, ips, reasons))
+
+
+def generate_exports(input_dir, files, rows, ips, reasons, fmt, seed=0):
+    """Genera `files` exportaciones sintéticas en input_dir y devuelve sus rutas."""
+    os.makedirs(input_dir, exist_ok=True)
+    rng = random.Random(seed)
+    formats = ["xlsx", "csv"] if fmt == "both" else [fmt]
+    paths = []
+    for i in range(files):
+        ext = formats[i % len(formats)]
+        path = os.path.join(input_dir, f"export_{i:04d}.{ext}")
+        if ext == "xlsx":
+            write_xlsx(path, i, rows, ips, reasons, rng)
+        else:
+            write_csv(path, rows, ips, reasons, rng)
+        paths.append(path)
+    return paths
+
+
+def peak_rss_mb():
+    """Pico de memoria residente (proceso y subprocesos) en MB, o None si no se puede medir."""
+    try:
+        import resource
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        # ru_maxrss está en KB en Linux y en bytes en macOS
+        scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+        return max(usage, children) / scale
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def timed(label, func, files, rows):
+    """Ejecuta func, muestra su rendimiento y devuelve su resultado."""
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    rss = peak_rss_mb()
+    rss_text = f"{rss:8.1f} MB" if rss is not None else "     n/d"
+    print(f"{label:<32} {elapsed:9.3f} s {files / elapsed:10.1f} arch/s "
+          f"{rows / elapsed:12.0f} filas/s  pico RSS {rss_text}")
+    return result
+
+
+def run_benchmark(args):
+    """Genera los datos sintéticos y mide cada etapa del procesamiento."""
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench_reportes_")
+    input_dir = os.path.join(workdir, "xls_folder")
+    temp_dir = os.path.join(workdir, "reports")
+    output_dir = os.path.join(workdir, "rapport2")
+
+    try:
+        print(f"Generando {args.files} archivos de {args.rows} filas en {workdir}...")
+        start = time.perf_counter()
+        paths = generate_exports(input_dir, args.files, args.rows, args.ips, args.reasons, args.format, args.seed)
+        print(f"Datos generados en {time.perf_counter() - start:.2f} s\n")
+
+        processor = ReportProcessor(input_dir=input_dir, temp_dir=temp_dir, output_dir=output_dir,
+                                    parallel=args.parallel, max_workers=args.workers,
+                                    fast_xlsx=args.fast_xlsx, csv_chunksize=args.csv_chunksize)
+        total_rows = args.files * args.rows
+
+        for ext in sorted({os.path.splitext(p)[1] for p in paths}):
+            sample = next(p for p in paths if p.endswith(ext))
+            timed(f"process_file ({ext})", lambda: processor.process_file(sample), 1, args.rows)
+
+        timed("extract_intermediate_reports", processor.extract_intermediate_reports, args.files, total_rows)
+        timed("generate_final_reports", processor.generate_final_reports, args.files, total_rows)
+        timed("run", processor.run, args.files, total_rows)
+        timed("run (pipeline)", lambda: processor.run(pipeline=True), args.files, total_rows)
+    finally:
+        if not args.keep and not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Banco de pruebas de rendimiento con exportaciones sintéticas.")
+    parser.add_argument('--files', type=int, default=10, help='Número de archivos a generar (por defecto: 10).')
+    parser.add_argument('--rows', type=int, default=10_000, help='Filas de datos por archivo (por defecto: 10000).')
+    parser.add_argument('--ips', type=int, default=500, help='Número de IPs distintas (por defecto: 500).')
+    parser.add_argument('--reasons', type=int, default=4, help='Número de razones distintas (por defecto: 4).')
+    parser.add_argument('--format', choices=['xlsx', 'csv', 'both'], default='both',
+                        help='Formato de los archivos generados (por defecto: both).')
+    parser.add_argument('--seed', type=int, default=0, help='Semilla de los datos aleatorios.')
+    parser.add_argument('--parallel', action='store_true', help='Usar el pool de procesos.')
+    parser.add_argument('--workers', type=int, default=None, help='Número de procesos para --parallel.')
+    parser.add_argument('--fast-xlsx', action='store_true', help='Usar la lectura directa del XML de los .xlsx.')
+    parser.add_argument('--csv-chunksize', type=int, default=100_000, help='Filas por bloque en los CSV.')
+    parser.add_argument('--workdir', default=None, help='Carpeta de trabajo (por defecto: una temporal).')
+    parser.add_argument('--keep', action='store_true', help='No borrar la carpeta temporal al terminar.')
+    args = parser.parse_args()
+
+    # Los logs por archivo distorsionan las mediciones
+    logging.getLogger().setLevel(logging.WARNING)
+
+    run_benchmark(args)
+
+
+if __name__ == "__main__":
+    main()
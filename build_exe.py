@@ -57,7 +57,6 @@ a = Analysis(
         'ttkbootstrap',
         'ttkbootstrap.constants',
         'ttkbootstrap.scrolled',
-        'pandas',
         'openpyxl',
         'tkinter',
         'tkinter.filedialog',
@@ -73,10 +72,8 @@ a = Analysis(
         'IPython',
         'matplotlib',
         'scipy',
-        'numpy.distutils',
-        'numpy.f2py',
-        'pandas.plotting',
-        'pandas.tests',
+        'numpy',  # Opcional (solo acelera --burst): fuera del ejecutable
+        'pandas',
         'test',
         'tests',
         'unittest'
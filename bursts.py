@@ -0,0 +1,193 @@
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+from aggregation import PERIOD_DATE_FORMATS
+from ip_utils import canonical_ip
+
+# Formatos adicionales de la columna de hora del evento (además de ISO 8601)
+EVENT_TIME_FORMATS = PERIOD_DATE_FORMATS + (
+    "%m/%d/%Y %I:%M:%S %p", "%m/%d/%Y %H:%M:%S", "%b %d, %Y %I:%M %p",
+)
+# Origen de las fechas seriales de Excel (celdas de fecha leídas como número)
+EXCEL_EPOCH = datetime(1899, 12, 30)
+
+def parse_event_time(value):
+    """Convierte la hora de un evento (texto, datetime o serial de Excel) en datetime, o None."""
+    if value is None or isinstance(value, datetime):
+        return value
+    text = str(value).strip()
+    if not text:
+        return None
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    try:
+        # Redondeo al segundo: el serial en días no es exacto (10:00:00 sería 09:59:59.99...)
+        return EXCEL_EPOCH + timedelta(seconds=round(float(text) * 86400))
+    except (ValueError, OverflowError):
+        pass
+    for fmt in EVENT_TIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+def parse_event_times(values):
+    """
+    Convierte la columna de hora en un arreglo datetime64[s] (NaT si no se reconoce).
+    Se intenta primero la conversión vectorizada de numpy (textos ISO) y solo si falla
+    se interpreta cada valor por separado. Requiere numpy.
+    """
+    import numpy as np
+
+    try:
+        return np.array(values, dtype="datetime64[s]")
+    except (ValueError, TypeError):
+        return np.array([parse_event_time(v) for v in values], dtype="datetime64[s]")
+
+def _burst(key, start, end, events, peak):
+    """Describe una ráfaga con sus extremos en formato ISO."""
+    return {
+        'key': key,
+        'start': start.isoformat(sep=" "),
+        'end': end.isoformat(sep=" "),
+        'events': int(events),
+        'peak': int(peak),
+    }
+
+def detect_bursts(keys, times, threshold, window_minutes):
+    """
+    Detecta las ráfagas de más de `threshold` eventos en `window_minutes` minutos por clave.
+
+    Los eventos se ordenan por (clave, hora) y, para cada uno, una búsqueda binaria
+    vectorizada (searchsorted) localiza el primer evento fuera de su ventana, así que
+    el coste es O(n log n) sin recorrer las ventanas en Python. Las ventanas marcadas
+    que se solapan se unen en una sola ráfaga. Devuelve una lista de diccionarios
+    (key, start, end, events, peak) ordenada por número de eventos.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        return _detect_bursts_python(keys, times, threshold, window_minutes)
+
+    times = parse_event_times(times)
+    keys = np.array(keys, dtype=object)
+    valid = ~np.isnat(times) & np.array([k is not None for k in keys], dtype=bool)
+    if not valid.any():
+        return []
+    names, codes = np.unique(keys[valid].astype(str), return_inverse=True)
+    seconds = times[valid].astype("int64")
+
+    order = np.lexsort((seconds, codes))
+    codes, seconds = codes[order], seconds[order]
+
+    # Clave y hora en un solo entero ordenado: cada clave ocupa su propio tramo
+    span = int(window_minutes * 60)
+    offset = seconds - seconds.min()
+    width = int(offset.max()) + span + 1
+    composite = codes.astype("int64") * width + offset
+    # Fin (exclusivo) de la ventana [t, t + T) de cada evento
+    end = np.searchsorted(composite, composite + span, side="left")
+    counts = end - np.arange(len(composite))
+
+    flagged = np.flatnonzero(counts > threshold)
+    if not len(flagged):
+        return []
+    # Una ventana empieza ráfaga nueva si no se solapa con la anterior marcada
+    flagged_end = end[flagged]
+    new = np.ones(len(flagged), dtype=bool)
+    new[1:] = flagged[1:] >= flagged_end[:-1]
+    groups = np.flatnonzero(new)
+    starts = flagged[groups]
+    # Los finales de ventana de una misma clave no decrecen
+    ends = np.maximum.reduceat(flagged_end, groups)
+    peaks = np.maximum.reduceat(counts[flagged], groups)
+
+    epoch = datetime(1970, 1, 1)
+    bursts = [
+        _burst(str(names[codes[s]]), epoch + timedelta(seconds=int(seconds[s])),
+               epoch + timedelta(seconds=int(seconds[e - 1])), e - s, p)
+        for s, e, p in zip(starts.tolist(), ends.tolist(), peaks.tolist())
+    ]
+    bursts.sort(key=lambda b: (-b['events'], b['key'], b['start']))
+    return bursts
+
+def _detect_bursts_python(keys, times, threshold, window_minutes):
+    """Equivalente de detect_bursts sin numpy, con una búsqueda binaria por evento."""
+    by_key = {}
+    for key, value in zip(keys, times):
+        moment = parse_event_time(value)
+        if key is not None and moment is not None:
+            by_key.setdefault(str(key), []).append(moment)
+
+    span = timedelta(minutes=window_minutes)
+    bursts = []
+    for key, moments in by_key.items():
+        moments.sort()
+        current = None  # [inicio, fin exclusivo, pico]
+        for i, moment in enumerate(moments):
+            end = bisect_left(moments, moment + span, i)
+            if end - i <= threshold:
+                continue
+            if current is not None and i < current[1]:
+                current[1] = max(current[1], end)
+                current[2] = max(current[2], end - i)
+                continue
+            if current is not None:
+                bursts.append(_burst(key, moments[current[0]], moments[current[1] - 1],
+                                     current[1] - current[0], current[2]))
+            current = [i, end, end - i]
+        if current is not None:
+            bursts.append(_burst(key, moments[current[0]], moments[current[1] - 1],
+                                 current[1] - current[0], current[2]))
+    bursts.sort(key=lambda b: (-b['events'], b['key'], b['start']))
+    return bursts
+
+class EventTimeline:
+    """
+    Hora, IP y cuenta de cada fila de datos de un archivo, para la detección de ráfagas.
+    Los valores vacíos (`na_values`) se descartan al analizar.
+    """
+    def __init__(self, na_values=()):
+        self.missing = set(na_values)
+        self.times = []
+        self.ips = []
+        self.accounts = []
+
+    def add(self, time, ip, account):
+        """Añade una fila de datos."""
+        self.times.append(time)
+        self.ips.append(ip)
+        self.accounts.append(account)
+
+    def extend(self, other):
+        """Añade las filas de otro registro (p. ej. de otro miembro de un comprimido)."""
+        self.times.extend(other.times)
+        self.ips.extend(other.ips)
+        self.accounts.extend(other.accounts)
+
+    def _clean(self, values, default=None):
+        missing = self.missing
+        return [default if v is None or v in missing else str(v) for v in values]
+
+    def detect(self, threshold, window_minutes, default_account=None):
+        """
+        Devuelve {'ip': [...], 'account': [...]} con las ráfagas por IP y por cuenta.
+        Las filas sin cuenta se atribuyen a `default_account` (la cuenta de la cabecera).
+        """
+        times = [None if t in self.missing else t for t in self.times]
+        try:
+            # La columna de hora se convierte una sola vez para los dos análisis
+            times = parse_event_times(times)
+        except ImportError:
+            pass
+        ips = self._clean(self.ips)
+        # Las distintas escrituras de una misma IP cuentan como una sola
+        canonical = {ip: canonical_ip(ip) for ip in set(ips) if ip is not None}
+        return {
+            'ip': detect_bursts([canonical.get(ip) for ip in ips], times, threshold, window_minutes),
+            'account': detect_bursts(self._clean(self.accounts, default_account), times,
+                                     threshold, window_minutes),
+        }
@@ -1,5 +1,5 @@
 import tkinter as tk
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, font as tkfont
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import os
@@ -7,12 +7,39 @@ import sys
 import threading
 import shutil
 import queue
+import time
 import logging
 from datetime import datetime
 from ttkbootstrap.scrolled import ScrolledText
 
 # Importar el procesador del otro archivo
-from automated_reports import ReportProcessor
+from automated_reports import ReportProcessor, SOURCE_EXTENSIONS, source_file
+from isolation import CANCELLED
+from report_pager import line_index
+
+# Estado mostrado en la lista para cada evento de progreso del procesador
+EVENT_STATUS = {
+    'started': 'Procesando...',
+    'parsed': 'Leído',
+    'failed': 'Error de Extracción',
+    'cancelled': 'Cancelado',
+}
+# Estado final según la etapa del evento 'written'
+STAGE_STATUS = {
+    'intermediate': 'Información Extraída',
+    'final': 'Reporte Final Generado',
+    'store': 'Guardado en el Almacén',
+}
+# Intervalo de lectura de las colas de eventos y de logs (ms)
+POLL_INTERVAL_MS = 100
+# Límites por archivo con "Aislar archivos": cada uno se lee en un proceso aparte que se
+# mata si los supera. Va desactivado por defecto porque lanza un proceso por archivo.
+FILE_TIMEOUT = 900 # segundos
+FILE_MEMORY_MB = 4096
+# Filas que se insertan en la lista por cada vuelta del mainloop
+ROW_CHUNK = 500
+# Líneas leídas por delante y por detrás de la página visible en la previsualización
+PREVIEW_READ_AHEAD = 200
 
 class QueueHandler(logging.Handler):
     """
@@ -39,10 +66,16 @@ class ReportProcessorGUI(ttk.Window):
         os.makedirs(self.output_dir, exist_ok=True)
         os.makedirs(self.temp_dir, exist_ok=True)
 
-        self.processor = ReportProcessor(input_dir=self.input_dir, output_dir=self.output_dir, temp_dir=self.temp_dir)
+        self.processor = ReportProcessor(input_dir=self.input_dir, output_dir=self.output_dir, temp_dir=self.temp_dir,
+                                         use_manifest=True)
+        self.worker = None # Hilo de la ejecución en curso
         
         # Estado de la aplicación
         self.files_to_process = {} # Diccionario para rastrear el estado de cada archivo
+        self.refreshing = False # Hay un escaneo de la carpeta de entrada en curso
+        self.refresh_pending = False # Se pidió otro escaneo mientras había uno en curso
+        self.force_rebuild = tk.BooleanVar(value=False) # Ignorar el manifiesto en la próxima extracción
+        self.isolate_files = tk.BooleanVar(value=False) # Leer cada archivo en un proceso con límites
         
         self.setup_ui()
         self.setup_logging()
@@ -82,6 +115,10 @@ class ReportProcessorGUI(ttk.Window):
         self.extract_button.pack(side=LEFT, padx=5)
         self.generate_button = ttk.Button(frame, text="3. Generar Informes Finales", command=self.start_final_report_generation, bootstyle="info", width=25)
         self.generate_button.pack(side=LEFT, padx=5)
+        self.cancel_button = ttk.Button(frame, text="Cancelar", command=self.cancel_run, bootstyle="danger", state='disabled')
+        self.cancel_button.pack(side=LEFT, padx=5)
+        ttk.Checkbutton(frame, text="Reprocesar todo", variable=self.force_rebuild, bootstyle="round-toggle").pack(side=LEFT, padx=5)
+        ttk.Checkbutton(frame, text="Aislar archivos", variable=self.isolate_files, bootstyle="round-toggle").pack(side=LEFT, padx=5)
         
         # Frame para botones de gestión
         management_frame = ttk.Frame(frame)
@@ -110,6 +147,10 @@ class ReportProcessorGUI(ttk.Window):
         scrollbar = ttk.Scrollbar(frame, orient=VERTICAL, command=self.tree.yview)
         self.tree.configure(yscroll=scrollbar.set)
         scrollbar.grid(row=0, column=1, sticky=NS)
+
+        # Progreso y rendimiento de la ejecución en curso
+        self.progress_var = tk.StringVar(value="")
+        ttk.Label(frame, textvariable=self.progress_var, bootstyle="secondary").grid(row=1, column=0, sticky=W, pady=(5, 0))
         
         # Eventos de selección
         self.tree.bind("<<TreeviewSelect>>", self.on_file_select)
@@ -146,17 +187,90 @@ class ReportProcessorGUI(ttk.Window):
         return frame
 
     def setup_logging(self):
-        # Pas besoin de logging complexe pour un simple footer
-        pass
+        """
+        Conecta el procesador con la interfaz: sus eventos de progreso y los avisos y
+        errores del log llegan por colas desde el hilo de trabajo y se leen en el hilo
+        de la interfaz con poll_log_queue().
+        """
+        self.event_queue = queue.Queue()
+        self.log_queue = queue.Queue()
+        self.processor.progress = self.event_queue.put
+        self.run_progress = {'total': 0, 'done': 0, 'rows': 0, 'start': None, 'finished': set()}
+
+        self.log_handler = QueueHandler(self.log_queue)
+        self.log_handler.setLevel(logging.WARNING)
+        self.log_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', datefmt='%H:%M:%S'))
+        logging.getLogger().addHandler(self.log_handler)
+
+        self.after(POLL_INTERVAL_MS, self.poll_log_queue)
 
     def poll_log_queue(self):
-        # Pas besoin de polling pour un footer statique
-        pass
+        """
+        Vacía las colas de eventos y de logs. Los eventos de un mismo archivo se combinan
+        y solo se aplica a la lista su último estado, en una sola pasada.
+        """
+        pending = {}
+        try:
+            while True:
+                event = self.event_queue.get_nowait()
+                status = self.apply_progress_event(event)
+                filename = source_file(event['file']) if event['file'] else None
+                if status and filename in self.files_to_process:
+                    pending[filename] = status
+        except queue.Empty:
+            pass
+
+        for filename, status in pending.items():
+            self.files_to_process[filename]['status'] = status
+            if self.tree.exists(filename):
+                self.tree.set(filename, "status", status)
+        if pending:
+            self.update_progress_label()
+
+        try:
+            while True:
+                record = self.log_queue.get_nowait()
+                self.log_text.insert(END, self.log_handler.format(record) + "\n")
+                self.log_text.see(END)
+        except queue.Empty:
+            pass
+
+        self.after(POLL_INTERVAL_MS, self.poll_log_queue)
+
+    def apply_progress_event(self, event):
+        """Actualiza los contadores de la ejecución y devuelve el estado del archivo (o None)."""
+        progress = self.run_progress
+        kind = event['event']
+        if kind == 'batch':
+            progress.update(total=event['total'], done=0, rows=0, start=event['time'], finished=set())
+            self.update_progress_label()
+            return None
+        if kind == 'parsed':
+            progress['rows'] += event.get('rows', 0)
+            return 'Sin cambios' if event.get('cached') else EVENT_STATUS[kind]
+        if kind in ('written', 'failed', 'cancelled'):
+            # Un comprimido termina con varios eventos, uno por exportación
+            progress['finished'].add(source_file(event['file']))
+            progress['done'] = len(progress['finished'])
+        if kind == 'written':
+            return STAGE_STATUS.get(event.get('stage'))
+        return EVENT_STATUS.get(kind)
+
+    def update_progress_label(self):
+        """Muestra los archivos terminados y el rendimiento (archivos/s y filas/s)."""
+        progress = self.run_progress
+        if progress['start'] is None:
+            return
+        elapsed = max(time.time() - progress['start'], 1e-6)
+        self.progress_var.set(
+            f"{progress['done']}/{progress['total']} archivos · "
+            f"{progress['done'] / elapsed:.1f} arch/s · {progress['rows'] / elapsed:,.0f} filas/s"
+        )
 
     def add_files(self):
         filepaths = filedialog.askopenfilenames(
             title="Seleccionar archivo(s) para añadir",
-            filetypes=[("Archivos de Reporte", "*.xls *.xlsx *.csv"), ("Todos los archivos", "*.*")]
+            filetypes=[("Archivos de Reporte", "*.xls *.xlsx *.csv *.zip *.gz *.tgz"), ("Todos los archivos", "*.*")]
         )
         if filepaths:
             try:
@@ -169,22 +283,58 @@ class ReportProcessorGUI(ttk.Window):
                 messagebox.showerror("Error", f"No se pudo añadir el archivo.\n{e}")
 
     def refresh_file_list(self):
-        # Guardar la selección actual
-        selected_item = self.tree.selection()
-        
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        
-        self.files_to_process = {f: {'status': 'Listo'} for f in os.listdir(self.input_dir) if f.lower().endswith(('.xls', '.xlsx', '.csv'))}
+        """
+        Vuelve a leer la carpeta de entrada en un hilo aparte y aplica a la lista solo
+        los cambios: los archivos nuevos se añaden como 'Listo', los que ya no están se
+        quitan y el resto conserva su estado.
+        """
+        if self.refreshing:
+            self.refresh_pending = True
+            return
+        self.refreshing = True
+        threading.Thread(target=self.scan_input_dir, daemon=True).start()
 
-        for filename, data in self.files_to_process.items():
-            self.tree.insert("", END, values=(filename, data['status']))
-            
-        # Restaurar la selección si aún existe
-        if selected_item:
-            self.tree.selection_set(selected_item)
-        
-        self.on_file_select() # Actualizar estado del botón
+    def scan_input_dir(self):
+        """Lista las exportaciones de la carpeta de entrada (se ejecuta fuera del hilo de la interfaz)."""
+        try:
+            with os.scandir(self.input_dir) as entries:
+                names = [entry.name for entry in entries
+                         if entry.name.lower().endswith(SOURCE_EXTENSIONS) and entry.is_file()]
+        except OSError as e:
+            logging.error(f"Error al leer la carpeta de entrada: {e}")
+            names = None
+        self.after(0, self.apply_file_list, names)
+
+    def apply_file_list(self, names):
+        """Compara el escaneo con files_to_process y actualiza solo las filas que cambian."""
+        if names is not None:
+            current = set(names)
+            removed = [f for f in self.files_to_process if f not in current]
+            added = sorted(f for f in current if f not in self.files_to_process)
+
+            for filename in removed:
+                del self.files_to_process[filename]
+            rows = [f for f in removed if self.tree.exists(f)]
+            if rows:
+                self.tree.delete(*rows)
+            for filename in added:
+                self.files_to_process[filename] = {'status': 'Listo'}
+            self.insert_rows(added)
+            self.on_file_select() # Actualizar estado del botón
+
+        self.refreshing = False
+        if self.refresh_pending:
+            self.refresh_pending = False
+            self.refresh_file_list()
+
+    def insert_rows(self, filenames, start=0):
+        """Inserta las filas por tramos de ROW_CHUNK para no bloquear el mainloop."""
+        for filename in filenames[start:start + ROW_CHUNK]:
+            # El archivo pudo quitarse de la lista antes de llegar su tramo
+            if filename in self.files_to_process and not self.tree.exists(filename):
+                self.tree.insert("", END, iid=filename, values=(filename, self.files_to_process[filename]['status']))
+        if start + ROW_CHUNK < len(filenames):
+            self.after(1, self.insert_rows, filenames, start + ROW_CHUNK)
 
     def on_file_select(self, event=None):
         """Actualiza el estado de los botones basados en la selección."""
@@ -206,35 +356,110 @@ class ReportProcessorGUI(ttk.Window):
         
         if report_path and os.path.exists(report_path):
             try:
-                with open(report_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                self.show_preview_window(os.path.basename(report_path), content)
+                self.show_preview_window(os.path.basename(report_path), report_path)
             except Exception as e:
                 messagebox.showerror("Error de Lectura", f"No se pudo leer el archivo de reporte:\n{e}")
         else:
             messagebox.showinfo("Sin Previsualización", "No hay un reporte que mostrar para este archivo.\n\nGenere la información o el informe final primero.")
 
     def get_report_path_for_file(self, filename, status):
-        """Devuelve la ruta a un archivo de reporte si existe."""
-        if status == "Información Extraída":
+        """
+        Devuelve la ruta a un archivo de reporte si existe. Un comprimido tiene un reporte
+        por exportación: se muestra el de la primera.
+        """
+        reports = sorted(report for report, source in self.processor.report_sources.items()
+                         if source_file(source) == filename)
+        if reports:
+            intermediate_name = reports[0]
+        else:
             base, _ = os.path.splitext(filename)
-            return os.path.join(self.temp_dir, f"{base}_reporte.txt")
+            intermediate_name = f"{base}_reporte.txt"
+        if status == "Información Extraída":
+            return os.path.join(self.temp_dir, intermediate_name)
         elif status == "Reporte Final Generado":
-            base, _ = os.path.splitext(filename)
-            intermediate_base_name = f"{base}_reporte"
+            intermediate_base_name, _ = os.path.splitext(intermediate_name)
             final_name = f"{intermediate_base_name}_final.txt"
             return os.path.join(self.output_dir, final_name)
         return None
 
-    def show_preview_window(self, title, content):
-        """Crea y muestra una ventana Toplevel para la previsualización."""
+    def show_preview_window(self, title, report_path):
+        """
+        Crea y muestra una ventana Toplevel para la previsualización. El reporte no se
+        carga entero: con el índice de líneas del archivo solo se lee la página visible
+        (y PREVIEW_READ_AHEAD líneas alrededor) a medida que se desplaza.
+        """
+        index = line_index(report_path)
         preview_window = ttk.Toplevel(self, title=f"Previsualización - {title}", size=(600, 500))
         preview_window.transient(self) # Mantener por encima de la principal
-        
-        text_area = ScrolledText(preview_window, padding=10, autohide=True)
-        text_area.pack(fill=BOTH, expand=True)
-        text_area.insert(END, content)
-        text_area.config(state='disabled')
+
+        frame = ttk.Frame(preview_window, padding=10)
+        frame.pack(fill=BOTH, expand=True)
+        frame.rowconfigure(0, weight=1)
+        frame.columnconfigure(0, weight=1)
+        text_area = tk.Text(frame, wrap='none', borderwidth=0)
+        text_area.grid(row=0, column=0, sticky=NSEW)
+        scrollbar = ttk.Scrollbar(frame, orient=VERTICAL)
+        scrollbar.grid(row=0, column=1, sticky=NS)
+        # Las líneas no se ajustan: las largas (saludo, pie) se recorren en horizontal
+        x_scrollbar = ttk.Scrollbar(frame, orient=HORIZONTAL, command=text_area.xview)
+        x_scrollbar.grid(row=1, column=0, sticky=EW)
+        text_area.config(xscrollcommand=x_scrollbar.set)
+        line_height = tkfont.Font(font=text_area['font']).metrics('linespace')
+
+        # Primera línea visible y tramo de líneas ya leído del archivo
+        page = {'top': 0, 'start': 0, 'lines': []}
+
+        def visible_rows():
+            return max(1, text_area.winfo_height() // line_height)
+
+        def render():
+            rows = visible_rows()
+            top = max(0, min(page['top'], len(index) - rows))
+            page['top'] = top
+            start, lines = page['start'], page['lines']
+            if top < start or top + rows > start + len(lines):
+                start = max(0, top - PREVIEW_READ_AHEAD)
+                lines = index.lines(start, rows + 2 * PREVIEW_READ_AHEAD)
+                page.update(start=start, lines=lines)
+            left = text_area.xview()[0]  # Se conserva el desplazamiento horizontal
+            text_area.config(state='normal')
+            text_area.delete('1.0', END)
+            text_area.insert(END, "\n".join(lines[top - start:top - start + rows]))
+            text_area.config(state='disabled')
+            text_area.xview_moveto(left)
+            total = max(len(index), 1)
+            scrollbar.set(top / total, min(top + rows, total) / total)
+
+        def scroll_to(top):
+            page['top'] = top
+            render()
+
+        def on_scrollbar(action, amount, unit=None):
+            if action == 'moveto':
+                scroll_to(int(float(amount) * len(index)))
+            elif action == 'scroll':
+                step = visible_rows() if unit == 'pages' else 1
+                scroll_to(page['top'] + int(amount) * step)
+
+        def on_wheel(event):
+            if getattr(event, 'num', None) == 4 or event.delta > 0:
+                scroll_to(page['top'] - 3)
+            else:
+                scroll_to(page['top'] + 3)
+            return "break"
+
+        scrollbar.config(command=on_scrollbar)
+        text_area.bind("<Configure>", lambda event: render())
+        text_area.bind("<MouseWheel>", on_wheel)
+        text_area.bind("<Button-4>", on_wheel)
+        text_area.bind("<Button-5>", on_wheel)
+        preview_window.bind("<Prior>", lambda event: on_scrollbar('scroll', -1, 'pages'))
+        preview_window.bind("<Next>", lambda event: on_scrollbar('scroll', 1, 'pages'))
+        preview_window.bind("<Up>", lambda event: on_scrollbar('scroll', -1, 'units'))
+        preview_window.bind("<Down>", lambda event: on_scrollbar('scroll', 1, 'units'))
+        preview_window.bind("<Home>", lambda event: scroll_to(0))
+        preview_window.bind("<End>", lambda event: scroll_to(len(index)))
+        render()
 
     def open_output_dir(self):
         try:
@@ -276,24 +501,59 @@ class ReportProcessorGUI(ttk.Window):
     def disable_buttons(self, state=True):
         self.extract_button.config(state='disabled' if state else 'normal')
         self.generate_button.config(state='disabled' if state else 'normal')
+        self.cancel_button.config(state='normal' if state else 'disabled')
 
-    def start_extraction(self):
+    def start_worker(self, target):
+        """Lanza una ejecución en un hilo aparte, anulando cualquier cancelación anterior."""
         self.disable_buttons()
-        thread = threading.Thread(target=self.run_extraction_thread)
-        thread.daemon = True
-        thread.start()
+        self.processor.reset_cancel()
+        self.worker = threading.Thread(target=target)
+        self.worker.start()
+
+    def cancel_run(self):
+        """
+        Detiene la ejecución en curso; con "Aislar archivos" los archivos que se estaban
+        leyendo se detienen al momento, si no, terminan antes de parar.
+        """
+        self.cancel_button.config(state='disabled')
+        logging.warning("Cancelando la ejecución en curso...")
+        self.processor.cancel()
+
+    def on_close(self):
+        """Al cerrar la ventana, cancela la ejecución en curso y espera a que termine."""
+        if self.worker is not None and self.worker.is_alive():
+            self.processor.cancel()
+            self.after(100, self.on_close)
+            return
+        self.destroy()
+
+    def start_extraction(self):
+        self.processor.force_rebuild = self.force_rebuild.get()
+        isolate = self.isolate_files.get()
+        self.processor.isolate = isolate
+        self.processor.file_timeout = FILE_TIMEOUT if isolate else None
+        self.processor.file_memory_mb = FILE_MEMORY_MB if isolate else None
+        self.start_worker(self.run_extraction_thread)
 
     def run_extraction_thread(self):
         try:
             processed, failed = self.processor.extract_intermediate_reports()
 
-            for p_file in processed:
-                self.files_to_process[p_file]['status'] = 'Información Extraída'
-            for f_file in failed:
-                self.files_to_process[f_file]['status'] = 'Error de Extracción'
+            errors = {f: stats.get('error') for f, stats in self.processor.metrics['files'].items()}
+            # Las exportaciones de un comprimido se muestran en la fila del comprimido
+            for p_file in map(source_file, processed):
+                if p_file in self.files_to_process:
+                    self.files_to_process[p_file]['status'] = 'Información Extraída'
+            for f_file in map(source_file, failed):
+                if f_file in self.files_to_process:
+                    cancelled = errors.get(f_file) == CANCELLED
+                    self.files_to_process[f_file]['status'] = 'Cancelado' if cancelled else 'Error de Extracción'
             
             self.after(0, self.update_treeview_statuses)
-            self.after(0, lambda: messagebox.showinfo("Extracción Completada", f"{len(processed)} archivo(s) procesado(s) para extracción.\nPuedes ahora generar los informes finales."))
+            if self.processor.cancelled:
+                self.after(0, lambda: messagebox.showwarning("Extracción Cancelada", f"Se canceló la extracción.\n{len(processed)} archivo(s) alcanzaron a procesarse."))
+            else:
+                self.after(0, lambda: messagebox.showinfo("Extracción Completada", f"{len(processed)} archivo(s) procesado(s) para extracción.\nPuedes ahora generar los informes finales."))
             
         except Exception as e:
             logging.error(f"Fallo crítico durante la extracción: {e}")
@@ -301,24 +561,27 @@ class ReportProcessorGUI(ttk.Window):
             self.after(0, self.disable_buttons, False)
     
     def start_final_report_generation(self):
-        self.disable_buttons()
-        thread = threading.Thread(target=self.run_generation_thread)
-        thread.daemon = True
-        thread.start()
+        self.start_worker(self.run_generation_thread)
         
     def run_generation_thread(self):
         try:
             processed, failed = self.processor.generate_final_reports()
             
-            # Actualizar estado para archivos que tenían reporte intermedio
+            # Los archivos con algún reporte fallido o cancelado no se marcan como generados
+            sources = self.processor.report_sources
+            not_written = {source_file(sources.get(f, f)) for f in failed}
             for item in self.tree.get_children():
                 filename = self.tree.item(item)['values'][0]
+                if filename in not_written:
+                    continue
                 if self.files_to_process.get(filename, {}).get('status') == 'Información Extraída':
                      self.files_to_process[filename]['status'] = 'Reporte Final Generado'
 
             self.after(0, self.update_treeview_statuses)
             
-            if processed:
+            if self.processor.cancelled:
+                self.after(0, lambda: messagebox.showwarning("Generación Cancelada", f"Se canceló la generación de reportes finales.\n{len(processed)} reporte(s) alcanzaron a generarse; los reportes intermedios pendientes se conservan."))
+            elif processed:
                 self.after(0, lambda: messagebox.showinfo("Éxito", f"Se generaron {len(processed)} reportes finales.\n\nPuedes encontrarlos en la carpeta:\n{self.output_dir}"))
             else:
                 self.after(0, lambda: messagebox.showwarning("Aviso", "No se encontraron reportes intermedios para procesar o todos fallaron."))
@@ -337,6 +600,7 @@ class ReportProcessorGUI(ttk.Window):
 
 def main():
     app = ReportProcessorGUI()
+    app.protocol("WM_DELETE_WINDOW", app.on_close)
     app.mainloop()
 
 if __name__ == "__main__":
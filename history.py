@@ -0,0 +1,98 @@
+from datetime import date, timedelta
+from functools import lru_cache
+
+# Momento de un archivo en el historial: su periodo o, si no se reconoce, cuándo se procesó
+SEEN_FROM = "COALESCE(s.period_start, s.processed_at)"
+SEEN_TO = "COALESCE(s.period_end, s.processed_at)"
+
+class ResultsHistory:
+    """
+    Consultas sobre el historial de resultados guardado en un ResultsStore: dónde y
+    cuándo se vio una IP, qué cuentas atacó y qué IPs de un archivo son nuevas.
+
+    Cada consulta usa los índices del almacén y sus respuestas se guardan en una caché
+    LRU en memoria; clear_cache() la vacía cuando el almacén cambia.
+    """
+    def __init__(self, store, cache_size=1024):
+        self.store = store
+        self.conn = store.conn
+        # Caché por instancia (lru_cache sobre el método la compartiría entre instancias)
+        self._ip_files = lru_cache(maxsize=cache_size)(self._query_ip_files)
+        self._ip_accounts = lru_cache(maxsize=cache_size)(self._query_ip_accounts)
+        self._ip_range = lru_cache(maxsize=cache_size)(self._query_ip_range)
+        self._new_ips = lru_cache(maxsize=cache_size)(self._query_new_ips)
+
+    def clear_cache(self):
+        """Vacía la caché de consultas (p. ej. tras guardar una nueva ejecución)."""
+        for cached in (self._ip_files, self._ip_accounts, self._ip_range, self._new_ips):
+            cached.cache_clear()
+
+    def ip_seen(self, ip, days=None):
+        """
+        Archivos en los que aparece la IP, limitados a los de los últimos `days` días.
+        Devuelve tuplas (archivo, desde, hasta, cuentas) ordenadas por fecha.
+        """
+        since = (date.today() - timedelta(days=days)).isoformat() if days is not None else ""
+        return self._ip_files(ip.strip(), since)
+
+    def accounts_for_ip(self, ip):
+        """Cuentas atacadas desde la IP: tuplas (cuenta, archivos, primera vez, última vez)."""
+        return self._ip_accounts(ip.strip())
+
+    def first_last_seen(self, ip):
+        """Devuelve (primera vez, última vez, archivos) de la IP, o None si nunca se vio."""
+        return self._ip_range(ip.strip())
+
+    def new_ips(self, filename):
+        """
+        IPs de un archivo guardado (su exportación más reciente) que no aparecen en
+        ningún archivo anterior, incluidas las exportaciones previas con el mismo nombre.
+        """
+        source_id = self.store.source_id(filename)
+        return self._new_ips(source_id) if source_id is not None else ()
+
+    def _query_ip_files(self, ip, since):
+        rows = self.conn.execute(
+            f"""SELECT s.filename, {SEEN_FROM}, {SEEN_TO},
+                       (SELECT group_concat(a.account, ', ') FROM accounts a WHERE a.source_id = s.id)
+                FROM ips i JOIN sources s ON s.id = i.source_id
+                WHERE i.ip = ? AND {SEEN_TO} >= ?
+                ORDER BY {SEEN_TO}, s.filename""",
+            (ip, since),
+        )
+        return tuple(rows)
+
+    def _query_ip_accounts(self, ip):
+        rows = self.conn.execute(
+            f"""SELECT a.account, COUNT(DISTINCT s.id), MIN({SEEN_FROM}), MAX({SEEN_TO})
+                FROM ips i
+                JOIN sources s ON s.id = i.source_id
+                JOIN accounts a ON a.source_id = s.id
+                WHERE i.ip = ?
+                GROUP BY a.account
+                ORDER BY 2 DESC, a.account""",
+            (ip,),
+        )
+        return tuple(rows)
+
+    def _query_ip_range(self, ip):
+        first, last, files = self.conn.execute(
+            f"""SELECT MIN({SEEN_FROM}), MAX({SEEN_TO}), COUNT(DISTINCT s.id)
+                FROM ips i JOIN sources s ON s.id = i.source_id
+                WHERE i.ip = ?""",
+            (ip,),
+        ).fetchone()
+        return (first, last, files) if files else None
+
+    def _query_new_ips(self, source_id):
+        rows = self.conn.execute(
+            f"""SELECT i.ip FROM sources s JOIN ips i ON i.source_id = s.id
+                WHERE s.id = ? AND NOT EXISTS (
+                    SELECT 1 FROM ips o JOIN sources p ON p.id = o.source_id
+                    WHERE o.ip = i.ip AND p.id != s.id
+                      AND COALESCE(p.period_start, p.processed_at) < {SEEN_FROM}
+                )
+                ORDER BY i.rowid""",
+            (source_id,),
+        )
+        return tuple(ip for ip, in rows)
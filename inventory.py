@@ -0,0 +1,106 @@
+import os
+import json
+import logging
+
+from aggregation import (
+    DOMAIN_FIELD, PERIOD_FIELD, RECORDS_FIELD, header_accounts, parse_period_date,
+)
+from report_writer import write_atomic
+
+INVENTORY_FILE = "inventario.json"
+INVENTORY_VERSION = 1
+
+def period_matches(period, query):
+    """
+    Indica si un campo Period corresponde a `query`: si `query` es una fecha, que esté
+    dentro del rango (por días); si no, que aparezca en el texto del periodo.
+    """
+    period = period or ""
+    moment = parse_period_date(query)
+    parts = period.split(" - ")
+    if moment is not None and len(parts) == 2:
+        start, end = parse_period_date(parts[0]), parse_period_date(parts[1])
+        if start is not None and end is not None:
+            return start.date() <= moment.date() <= end.date()
+    return query.strip().lower() in period.lower()
+
+class Inventory:
+    """
+    Índice de los metadatos de cabecera (dominio, periodo, cuentas, registros...) de las
+    exportaciones de una carpeta, para elegir qué archivos extraer sin leer sus datos.
+
+    Cada entrada se identifica por el nombre, el tamaño y la fecha de modificación del
+    archivo; lookup() solo devuelve las que no cambiaron desde el último inventario.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        """Carga el inventario desde disco; si no existe o es inválido se empieza vacío."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == INVENTORY_VERSION:
+                self.entries = data.get("files", {})
+        except Exception as e:
+            logging.warning(f"No se pudo leer el inventario {self.path}, se reconstruirá: {e}")
+            self.entries = {}
+
+    def save(self):
+        """Guarda el inventario si hubo cambios."""
+        if not self.dirty:
+            return
+        try:
+            write_atomic(self.path, json.dumps(
+                {"version": INVENTORY_VERSION, "files": self.entries}, ensure_ascii=False, indent=1))
+            self.dirty = False
+        except Exception as e:
+            logging.error(f"Error al guardar el inventario {self.path}: {e}")
+
+    def lookup(self, filename, st):
+        """Devuelve la entrada del archivo si no cambió (según su os.stat), o None."""
+        entry = self.entries.get(filename)
+        if entry is None or entry["size"] != st.st_size or entry["mtime"] != st.st_mtime_ns:
+            return None
+        return entry
+
+    def update(self, filename, header, st):
+        """Guarda (o reemplaza) la cabecera de un archivo."""
+        self.entries[filename] = {
+            "size": st.st_size,
+            "mtime": st.st_mtime_ns,
+            "domain": header.get(DOMAIN_FIELD, ""),
+            "period": header.get(PERIOD_FIELD, ""),
+            "accounts": header_accounts(header) if header else [],
+            "records": header.get(RECORDS_FIELD, ""),
+            "header": header,
+        }
+        self.dirty = True
+
+    def prune(self, filenames):
+        """Quita las entradas de los archivos que ya no están en `filenames`."""
+        keep = set(filenames)
+        for filename in [f for f in self.entries if f not in keep]:
+            del self.entries[filename]
+            self.dirty = True
+
+    def select(self, domain=None, period=None, account=None):
+        """
+        Nombres de los archivos que cumplen todos los filtros indicados: dominio y
+        cuenta sin distinguir mayúsculas, y periodo según period_matches().
+        """
+        selected = []
+        for filename, entry in self.entries.items():
+            if domain and entry["domain"].lower() != domain.strip().lower():
+                continue
+            if period and not period_matches(entry["period"], period):
+                continue
+            if account and account.strip().lower() not in (a.lower() for a in entry["accounts"]):
+                continue
+            selected.append(filename)
+        return sorted(selected)
@@ -0,0 +1,68 @@
+import socket
+import ipaddress
+
+def parse_ip(value):
+    """Devuelve (versión, entero) de una IP en texto, o None si no es una dirección IP."""
+    text = value.strip()
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, text), "big")
+    except (OSError, ValueError):
+        pass
+    try:
+        return 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, text), "big")
+    except (OSError, ValueError):
+        return None
+
+def _format_ip(ip):
+    """Escritura canónica de una IP dada como (versión, entero)."""
+    version, number = ip
+    return str(ipaddress.IPv4Address(number) if version == 4 else ipaddress.IPv6Address(number))
+
+def canonical_ip(value):
+    """
+    Devuelve la escritura canónica de una IP (p. ej. 2001:db8::1 para 2001:0DB8:0::1),
+    o el valor sin cambios si no es una dirección IP.
+    """
+    ip = parse_ip(value)
+    return value if ip is None else _format_ip(ip)
+
+def sort_ips(values):
+    """
+    Devuelve las IPs únicas ordenadas numéricamente (IPv4 antes que IPv6, de modo que
+    10.0.0.9 va antes que 10.0.0.10), en su escritura canónica: las distintas
+    escrituras de una misma IPv6 quedan en una sola entrada. Los valores que no son
+    IP se añaden al final, en orden alfabético.
+    """
+    parsed = set()
+    others = []
+    for value in values:
+        ip = parse_ip(value)
+        if ip is None:
+            others.append(value)
+        else:
+            parsed.add(ip)
+    addresses = [_format_ip(ip) for ip in sorted(parsed)]
+    return addresses + sorted(set(others))
+
+def collapse_ips(values):
+    """
+    Agrupa las IPs contiguas en bloques CIDR (p. ej. 10.0.0.0 a 10.0.0.255 -> 10.0.0.0/24).
+    Las direcciones sueltas se muestran sin prefijo y los valores que no son IP se conservan al final.
+    """
+    addresses = {4: [], 6: []}
+    others = []
+    for value in values:
+        ip = parse_ip(value)
+        if ip is None:
+            others.append(value)
+        else:
+            addresses[ip[0]].append(ipaddress.IPv4Address(ip[1]) if ip[0] == 4 else ipaddress.IPv6Address(ip[1]))
+
+    blocks = []
+    for version in (4, 6):
+        for network in ipaddress.collapse_addresses(addresses[version]):
+            if network.prefixlen == network.max_prefixlen:
+                blocks.append(str(network.network_address))
+            else:
+                blocks.append(str(network))
+    return blocks + sorted(set(others))
@@ -0,0 +1,147 @@
+import time
+import logging
+import multiprocessing
+from multiprocessing.connection import wait
+
+# Motivo de fallo de los archivos que no llegaron a procesarse por una cancelación
+CANCELLED = "Ejecución cancelada"
+
+def _memory_rlimit_available():
+    try:
+        import resource  # Solo existe en sistemas POSIX
+    except ImportError:
+        return False
+    return hasattr(resource, "RLIMIT_AS")
+
+def _memory_error(memory_mb):
+    if memory_mb:
+        return f"Límite de memoria excedido ({memory_mb:g} MB)"
+    return "Memoria insuficiente"
+
+def _run_isolated(conn, target, args, memory_mb):
+    """Cuerpo del proceso aislado: aplica el límite de memoria, ejecuta y envía el resultado."""
+    if memory_mb:
+        import resource
+
+        limit = int(memory_mb * 1024 * 1024)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    try:
+        result = (True, target(*args))
+    except MemoryError:
+        result = (False, _memory_error(memory_mb))
+    except Exception as e:
+        result = (False, str(e) or type(e).__name__)
+    try:
+        conn.send(result)
+    except MemoryError:
+        conn.send((False, _memory_error(memory_mb)))
+    finally:
+        conn.close()
+
+class IsolatedRunner:
+    """
+    Ejecuta cada tarea en su propio proceso, con hasta `max_workers` a la vez, para
+    poder detener la que se cuelgue o se dispare sin afectar a las demás.
+
+    Una tarea que supera `timeout` segundos o `memory_mb` MB se mata y se informa como
+    fallida con el motivo. El límite de memoria se aplica con RLIMIT_AS (memoria
+    virtual del proceso) donde existe el módulo resource; en Windows se vigila la
+    memoria residente con psutil si está instalado. Si `cancel_event` se activa, los
+    procesos en curso se matan y las tareas restantes se informan como CANCELLED.
+    """
+    def __init__(self, max_workers=1, timeout=None, memory_mb=None, cancel_event=None, poll_interval=0.1):
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.cancel_event = cancel_event
+        self.poll_interval = poll_interval
+        # Dónde se aplica el límite de memoria: en el propio proceso o vigilándolo desde aquí
+        self._child_memory_mb = None
+        self._psutil = None
+        if memory_mb:
+            if _memory_rlimit_available():
+                self._child_memory_mb = memory_mb
+            else:
+                try:
+                    import psutil  # Importación diferida (opcional)
+                    self._psutil = psutil
+                except ImportError:
+                    logging.warning("El límite de memoria por archivo requiere el módulo resource o psutil; se ignora.")
+
+    def _cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def _over_memory(self, process):
+        if self._psutil is None:
+            return False
+        try:
+            return self._psutil.Process(process.pid).memory_info().rss > self.memory_mb * 1024 * 1024
+        except self._psutil.Error:
+            return False
+
+    @staticmethod
+    def _kill(process, conn):
+        conn.close()
+        if process.is_alive():
+            process.kill()
+        process.join()
+
+    def run(self, target, jobs, on_start=None):
+        """
+        Ejecuta target(*args) para cada (clave, args) de `jobs` y devuelve
+        (clave, resultado, error) a medida que terminan; error es None si fue bien.
+        Si se pasa `on_start`, se llama con la clave al lanzar el proceso de cada tarea.
+        """
+        context = multiprocessing.get_context()
+        pending = list(jobs)
+        pending.reverse()  # Se sacan del final en el orden original
+        running = {}  # conexión -> (clave, proceso, inicio)
+        try:
+            while pending or running:
+                if self._cancelled():
+                    for conn, (key, process, _) in list(running.items()):
+                        del running[conn]
+                        self._kill(process, conn)
+                        yield key, None, CANCELLED
+                    while pending:
+                        yield pending.pop()[0], None, CANCELLED
+                    return
+
+                while pending and len(running) < self.max_workers:
+                    key, args = pending.pop()
+                    reader, writer = context.Pipe(duplex=False)
+                    process = context.Process(target=_run_isolated,
+                                              args=(writer, target, args, self._child_memory_mb), daemon=True)
+                    process.start()
+                    writer.close()
+                    running[reader] = (key, process, time.monotonic())
+                    if on_start is not None:
+                        on_start(key)
+
+                for conn in wait(list(running), timeout=self.poll_interval):
+                    key, process, _ = running.pop(conn)
+                    try:
+                        ok, value = conn.recv()
+                    except (EOFError, OSError):
+                        process.join()
+                        ok, value = False, f"El proceso terminó inesperadamente (código {process.exitcode})"
+                    finally:
+                        conn.close()
+                    process.join()
+                    yield key, (value if ok else None), (None if ok else value)
+
+                now = time.monotonic()
+                for conn, (key, process, started) in list(running.items()):
+                    if self.timeout and now - started > self.timeout:
+                        error = f"Tiempo límite excedido ({self.timeout:g} s)"
+                    elif self._over_memory(process):
+                        error = _memory_error(self.memory_mb)
+                    else:
+                        continue
+                    del running[conn]
+                    self._kill(process, conn)
+                    yield key, None, error
+        finally:
+            # Si se abandona la iteración no quedan procesos huérfanos
+            for conn, (_, process, _) in running.items():
+                self._kill(process, conn)
@@ -3,27 +3,46 @@
 Script de lanzamiento para el Generador de Reportes de Seguridad.
 """
 
+import time
+_START = time.perf_counter()
+
 import sys
 import os
 import argparse
-from pathlib import Path
+import importlib.util
 
-def check_dependencies():
-    """Verifica si las dependencias requeridas están instaladas."""
-    # tkinter no se instala vía pip, por eso se maneja diferente.
-    required_packages = {'pandas': 'pandas', 'openpyxl': 'openpyxl', 'ttkbootstrap': 'ttkbootstrap'}
-    missing_packages = []
-    
-    for pkg_import, pkg_install in required_packages.items():
-        try:
-            __import__(pkg_import)
-        except ImportError:
-            missing_packages.append(pkg_install)
-    
-    try:
-        import tkinter
-    except ImportError:
-        missing_packages.append("tkinter")
+# Dependencias necesarias en cada modo (módulo a importar -> paquete de pip).
+# tkinter no se instala vía pip, por eso se maneja diferente.
+GUI_PACKAGES = {'openpyxl': 'openpyxl', 'ttkbootstrap': 'ttkbootstrap', 'tkinter': 'tkinter'}
+CLI_PACKAGES = {'openpyxl': 'openpyxl'}
+
+# Marcas de tiempo del arranque, mostradas con --timing
+_timings = []
+
+def mark_time(label):
+    """Registra el instante en que termina una fase del arranque."""
+    _timings.append((label, time.perf_counter()))
+
+def print_timings():
+    """Muestra la duración de cada fase desde el inicio del lanzador."""
+    print("\n⏱️ Tiempos de arranque:")
+    previous = _START
+    for label, instant in _timings:
+        print(f"  {label:<32} {instant - previous:8.3f} s")
+        previous = instant
+    print(f"  {'Total':<32} {previous - _START:8.3f} s")
+
+def check_dependencies(required_packages=None):
+    """
+    Verifica si las dependencias requeridas están instaladas, sin llegar a importarlas.
+    Por defecto se comprueban las de todos los modos.
+    """
+    if required_packages is None:
+        required_packages = {**GUI_PACKAGES, **CLI_PACKAGES}
+    missing_packages = [
+        pkg_install for pkg_import, pkg_install in required_packages.items()
+        if importlib.util.find_spec(pkg_import) is None
+    ]
 
     if missing_packages:
         print("❌ Dependencias faltantes:")
@@ -51,24 +70,130 @@ def run_gui():
         print(f"❌ Error al iniciar la interfaz gráfica: {e}")
         sys.exit(1)
 
-def run_cli(input_dir, output_dir):
+def create_processor(args):
+    """Crea el ReportProcessor con las opciones de la línea de comandos."""
+    from automated_reports import ReportProcessor
+    mark_time("Importación del procesador")
+    
+    return ReportProcessor(input_dir=args.input, output_dir=args.output,
+                           parallel=args.parallel, max_workers=args.workers,
+                           fast_xlsx=args.fast_xlsx, csv_chunksize=args.csv_chunksize,
+                           use_manifest=True, force_rebuild=args.rebuild,
+                           dump_metrics=args.metrics, aggregate=args.summary,
+                           summary_top=args.summary_top, group_by_account=args.group_by_account,
+                           collapse_cidr=args.cidr, count_events=args.counts, top_n=args.top,
+                           burst_threshold=args.burst, burst_window=args.burst_window,
+                           writer_threads=args.writers, store_path=args.store, store_only=args.store_only,
+                           templates_dir=args.templates, file_timeout=args.timeout,
+                           file_memory_mb=args.max_memory, isolate=args.isolate)
+
+def run_cli(args):
     """Ejecuta la aplicación en modo de línea de comandos (CLI)."""
     try:
-        from automated_reports import ReportProcessor
-        
         print("🚀 Iniciando el procesamiento en modo de línea de comandos...")
-        processor = ReportProcessor(input_dir=input_dir, output_dir=output_dir)
-        results = processor.run()
+        processor = create_processor(args)
+        files = None
+        if args.domain or args.period or args.account:
+            # Solo se extraen los archivos cuya cabecera cumple los filtros
+            files = processor.scan_inventory().select(args.domain, args.period, args.account)
+            mark_time("Inventario")
+            print(f"🔎 {len(files)} archivo(s) cumplen los filtros")
+        results = processor.run(pipeline=args.pipeline, files=files)
+        mark_time("Procesamiento")
         
         print(f"\n🎯 ¡Procesamiento completado!")
         print(f"📊 {len(results['processed'])} archivos procesados")
         print(f"❌ {len(results['failed'])} archivos con errores")
         print(f"⏱️ Duración: {results['duration']}")
+        if args.burst is not None:
+            flagged = sum(1 for b in results['bursts'].values() if b['ip'] or b['account'])
+            print(f"🚨 {flagged} archivos con ráfagas de fallos")
+        for filename, error in results['errors'].items():
+            print(f"   ✗ {filename}: {error}")
         
     except Exception as e:
         print(f"❌ Error durante el procesamiento: {e}")
         sys.exit(1)
 
+def run_inventory(args):
+    """Lista las cabeceras de los archivos de entrada (--inventory), con los filtros indicados."""
+    try:
+        processor = create_processor(args)
+        inventory = processor.scan_inventory()
+        selected = inventory.select(args.domain, args.period, args.account)
+        
+        print(f"🗂️ {len(selected)} de {len(inventory.entries)} archivo(s) en {args.input}")
+        for filename in selected:
+            entry = inventory.entries[filename]
+            print(f"  {filename} | {entry['domain'] or '-'} | {entry['period'] or '-'} | "
+                  f"{', '.join(entry['accounts']) or '-'} | {entry['records'] or '-'} registros")
+        print(f"📄 Inventario guardado en {processor.inventory_path}")
+    except Exception as e:
+        print(f"❌ Error durante el inventario: {e}")
+        sys.exit(1)
+
+def open_store_processor(args):
+    """Crea un ReportProcessor sobre el almacén de resultados de --store, que debe existir."""
+    from automated_reports import ReportProcessor
+    
+    store_path = args.store or 'resultados.sqlite'
+    if not os.path.exists(store_path):
+        print(f"❌ No existe el almacén de resultados {store_path}")
+        sys.exit(1)
+    return ReportProcessor(output_dir=args.output, store_path=store_path, top_n=args.top,
+                           templates_dir=args.templates,
+                           burst_threshold=args.burst, burst_window=args.burst_window)
+
+def run_render(args):
+    """Muestra el reporte final de un archivo a partir del almacén de resultados."""
+    processor = open_store_processor(args)
+    store_path = processor.store_path
+    text = processor.render_stored_report(args.render)
+    if text is None:
+        print(f"❌ {args.render} no está en {store_path}")
+        sys.exit(1)
+    print(text, end="")
+
+def run_history(args):
+    """Consulta el historial del almacén de resultados (--history y --new-ips)."""
+    history = open_store_processor(args).history()
+    
+    if args.history:
+        ip = args.history
+        seen = history.first_last_seen(ip)
+        if seen is None:
+            print(f"🔍 {ip} no aparece en el historial")
+            return
+        first, last, files = seen
+        print(f"🔍 {ip}: vista en {files} archivo(s), primera vez {first}, última vez {last}")
+        print("\nCuentas atacadas:")
+        for account, n, account_first, account_last in history.accounts_for_ip(ip):
+            print(f"  - {account}: {n} archivo(s), {account_first} → {account_last}")
+        recent = history.ip_seen(ip, args.days)
+        period = f"en los últimos {args.days} días" if args.days is not None else "en total"
+        print(f"\nArchivos {period}: {len(recent)}")
+        for filename, start, end, accounts in recent:
+            print(f"  - {filename}: {start} → {end} ({accounts})")
+    
+    if args.new_ips:
+        ips = history.new_ips(args.new_ips)
+        print(f"🆕 IPs de {args.new_ips} no vistas en archivos anteriores: {len(ips)}")
+        for ip in ips:
+            print(f"  - {ip}")
+
+def run_watch(args):
+    """Vigila la carpeta de entrada y procesa los archivos a medida que llegan."""
+    try:
+        from watcher import FolderWatcher
+        
+        print(f"👀 Vigilando la carpeta {args.input} (Ctrl+C para salir)...")
+        processor = create_processor(args)
+        FolderWatcher(processor, interval=args.interval, settle=args.settle, pipeline=args.pipeline).run()
+        
+    except Exception as e:
+        print(f"❌ Error durante la vigilancia: {e}")
+        sys.exit(1)
+
 def main():
     """Función principal del lanzador."""
     parser = argparse.ArgumentParser(
@@ -79,36 +204,137 @@ Ejemplos de uso:
   python launcher.py                                # Lanza la interfaz gráfica (GUI)
   python launcher.py --cli                          # Lanza en modo de línea de comandos (CLI)
   python launcher.py --cli --input data --output reports    # Personaliza las carpetas de entrada/salida
+  python launcher.py --cli --parallel --workers 4   # Procesa los archivos en 4 procesos en paralelo
+  python launcher.py --cli --rebuild                # Vuelve a leer todos los archivos, aunque no hayan cambiado
+  python launcher.py --cli --timeout 600 --max-memory 4096   # Detiene los archivos que tarden o consuman demasiado
+  python launcher.py --watch --pipeline             # Procesa los archivos a medida que llegan a la carpeta de entrada
+  python launcher.py --cli --store --store-only     # Guarda los resultados en SQLite sin reportes de texto
+  python launcher.py --store --render export.xlsx   # Muestra el reporte de un archivo guardado
+  python launcher.py --store --history 10.0.0.5 --days 30   # Historial de una IP en los últimos 30 días
+  python launcher.py --inventory --domain EMPRESA.LOCAL    # Lista los archivos de un dominio leyendo solo su cabecera
+  python launcher.py --cli --period 2025-01-03      # Extrae solo los archivos cuyo periodo incluye esa fecha
         """
     )
     
     parser.add_argument('--cli', action='store_true', 
                        help='Ejecutar en modo de línea de comandos (CLI).')
+    parser.add_argument('--watch', action='store_true',
+                       help='Vigilar la carpeta de entrada y procesar los archivos nuevos o modificados.')
+    parser.add_argument('--interval', type=float, default=2.0,
+                       help='Segundos entre revisiones de la carpeta en modo --watch (por defecto: 2).')
+    parser.add_argument('--settle', type=float, default=5.0,
+                       help='Segundos sin cambios para considerar un archivo completo en modo --watch (por defecto: 5).')
     parser.add_argument('--input', default='xls_folder', 
                        help='Carpeta de entrada para los archivos a procesar (por defecto: xls_folder).')
     parser.add_argument('--output', default='rapport2', 
                        help='Carpeta de salida para los reportes generados (por defecto: rapport2).')
+    parser.add_argument('--parallel', action='store_true',
+                       help='Procesar los archivos en paralelo con varios procesos (CLI y --watch).')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Número de procesos para --parallel (por defecto: número de núcleos).')
+    parser.add_argument('--fast-xlsx', action='store_true',
+                       help='Leer los .xlsx directamente desde su XML, sin openpyxl (CLI y --watch).')
+    parser.add_argument('--csv-chunksize', type=int, default=100_000,
+                       help='Filas leídas por bloque en los archivos CSV (por defecto: 100000).')
+    parser.add_argument('--rebuild', action='store_true',
+                       help='Ignorar el manifiesto y volver a leer todos los archivos (CLI y --watch).')
+    parser.add_argument('--pipeline', action='store_true',
+                       help='Generar los reportes finales en memoria, sin reportes intermedios (CLI y --watch).')
+    parser.add_argument('--metrics', action='store_true',
+                       help='Guardar las métricas por archivo y etapa en process_reports_metrics.jsonl (CLI y --watch).')
+    parser.add_argument('--group-by-account', action='store_true',
+                       help='Generar un único reporte final por cuenta y dominio (CLI y --watch).')
+    parser.add_argument('--cidr', action='store_true',
+                       help='Agrupar las IPs contiguas en bloques CIDR en los reportes (CLI y --watch).')
+    parser.add_argument('--counts', action='store_true',
+                       help='Contar los eventos por IP, razón y par (IP, razón) y ordenar las listas por frecuencia (CLI y --watch).')
+    parser.add_argument('--top', type=int, default=None,
+                       help='Mostrar como máximo N elementos en cada lista de los reportes.')
+    parser.add_argument('--templates', metavar='CARPETA', default=None,
+                       help='Carpeta con plantillas de mensaje (encabezado.txt, pie.txt, pie_<categoría>.txt).')
+    parser.add_argument('--writers', type=int, default=0, metavar='N',
+                       help='Escribir los reportes en segundo plano con N hilos (por defecto: en el hilo principal).')
+    parser.add_argument('--burst', type=int, default=None, metavar='N',
+                       help='Detectar ráfagas de más de N fallos por IP o cuenta en --burst-window minutos (CLI y --watch).')
+    parser.add_argument('--burst-window', type=float, default=10, metavar='T',
+                       help='Ventana en minutos de la detección de ráfagas (por defecto: 10).')
+    parser.add_argument('--store', nargs='?', const='resultados.sqlite', default=None, metavar='DB',
+                       help='Guardar los resultados en una base SQLite indexada (por defecto: resultados.sqlite).')
+    parser.add_argument('--store-only', action='store_true',
+                       help='Con --store, no escribir reportes de texto por archivo (se generan con --render).')
+    parser.add_argument('--render', metavar='ARCHIVO',
+                       help='Mostrar el reporte final de un archivo guardado en --store y terminar.')
+    parser.add_argument('--history', metavar='IP',
+                       help='Consultar en --store cuándo se vio una IP y qué cuentas atacó, y terminar.')
+    parser.add_argument('--days', type=int, default=None,
+                       help='Con --history, listar solo los archivos de los últimos N días.')
+    parser.add_argument('--new-ips', metavar='ARCHIVO',
+                       help='Listar las IPs de un archivo guardado en --store que no aparecen en archivos anteriores.')
+    parser.add_argument('--timeout', type=float, default=None, metavar='SEG',
+                       help='Leer cada archivo en un proceso aparte y detenerlo si tarda más de SEG segundos (CLI y --watch).')
+    parser.add_argument('--max-memory', type=float, default=None, metavar='MB',
+                       help='Leer cada archivo en un proceso aparte y detenerlo si supera MB megabytes (CLI y --watch).')
+    parser.add_argument('--isolate', action='store_true',
+                       help='Leer cada archivo en un proceso aparte aunque no haya límites (CLI y --watch).')
+    parser.add_argument('--inventory', action='store_true',
+                       help='Listar dominio, periodo y cuentas de cada archivo leyendo solo su cabecera, y terminar.')
+    parser.add_argument('--domain', default=None,
+                       help='Con --inventory o --cli, solo los archivos de este dominio.')
+    parser.add_argument('--period', default=None,
+                       help='Con --inventory o --cli, solo los archivos cuyo periodo incluye esta fecha (o este texto).')
+    parser.add_argument('--account', default=None,
+                       help='Con --inventory o --cli, solo los archivos de esta cuenta.')
+    parser.add_argument('--summary', action='store_true',
+                       help='Generar un reporte consolidado del lote con las IPs ordenadas por alcance (CLI y --watch).')
+    parser.add_argument('--summary-top', type=int, default=None,
+                       help='Limitar el reporte consolidado a las N IPs con más alcance.')
+    parser.add_argument('--timing', action='store_true',
+                       help='Mostrar la duración de cada fase del arranque y del procesamiento (solo CLI).')
     parser.add_argument('--check', action='store_true', 
                        help='Verifica las dependencias y termina.')
     
     args = parser.parse_args()
+    mark_time("Arranque y argumentos")
+    
+    # Forzar la codificación UTF-8 en Windows
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
     
     print("📋 Generador de Reportes de Seguridad")
     print("=" * 40)
     
     if args.check:
-        if check_dependencies():
+        ok = check_dependencies()
+        if ok:
             print("\n✅ Todas las dependencias requeridas están instaladas.")
-        sys.exit(0 if check_dependencies() else 1)
+        sys.exit(0 if ok else 1)
+    
+    if args.render:
+        run_render(args)
+        sys.exit(0)
+    if args.history or args.new_ips:
+        run_history(args)
+        sys.exit(0)
     
-    if not check_dependencies():
+    # Solo se verifican las dependencias del modo elegido
+    if not check_dependencies(CLI_PACKAGES if (args.cli or args.watch or args.inventory) else GUI_PACKAGES):
         sys.exit(1)
+    mark_time("Verificación de dependencias")
     
     # Lancer l'application
-    if args.cli:
-        run_cli(args.input, args.output)
+    if args.inventory:
+        run_inventory(args)
+    elif args.watch:
+        run_watch(args)
+    elif args.cli:
+        run_cli(args)
+        if args.timing:
+            print_timings()
     else:
         run_gui()
 
 if __name__ == "__main__":
+    # Necesario para el pool de procesos en el ejecutable generado con PyInstaller
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
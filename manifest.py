@@ -0,0 +1,185 @@
+import os
+import json
+import hashlib
+import logging
+from collections import Counter
+
+MANIFEST_VERSION = 4
+
+class ExtractionManifest:
+    """
+    Manifiesto persistente con los datos extraídos de cada archivo de origen.
+    Cada entrada se identifica por la ruta, el tamaño y la fecha de modificación
+    del archivo (y opcionalmente un hash SHA-256 de su contenido). La entrada de un
+    comprimido guarda los datos de cada una de sus exportaciones en "members".
+    """
+    def __init__(self, path, use_hash=False):
+        self.path = path
+        self.use_hash = use_hash
+        self.entries = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        """Carga el manifiesto desde disco; si no existe o es inválido se empieza vacío."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.entries = data.get("files", {})
+        except Exception as e:
+            logging.warning(f"No se pudo leer el manifiesto {self.path}, se reconstruirá: {e}")
+            self.entries = {}
+
+    def save(self):
+        """Guarda el manifiesto si hubo cambios, descartando archivos que ya no existen."""
+        stale = [p for p in self.entries if not os.path.exists(p)]
+        for p in stale:
+            del self.entries[p]
+        if not (self.dirty or stale):
+            return
+
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": MANIFEST_VERSION, "files": self.entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except Exception as e:
+            logging.error(f"Error al guardar el manifiesto {self.path}: {e}")
+
+    @staticmethod
+    def file_hash(path):
+        """Calcula el hash SHA-256 del contenido de un archivo."""
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(block)
+        return h.hexdigest()
+
+    def _fresh_entry(self, path):
+        """Devuelve la entrada del archivo si no cambió desde la última ejecución, o None."""
+        key = os.path.abspath(path)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        st = os.stat(path)
+        if entry["size"] != st.st_size:
+            return None
+        if entry["mtime"] != st.st_mtime_ns:
+            # La fecha cambió (p. ej. archivo copiado de nuevo): comprobar el contenido
+            if not (self.use_hash and entry.get("sha256") and entry["sha256"] == self.file_hash(path)):
+                return None
+            entry["mtime"] = st.st_mtime_ns
+            self.dirty = True
+        return entry
+
+    def _data(self, path, member=None):
+        """Datos guardados de un archivo o, con `member`, de una exportación de un comprimido."""
+        entry = self.entries.get(os.path.abspath(path), {})
+        if member is not None:
+            return entry.get("members", {}).get(member, {})
+        return entry
+
+    def lookup(self, path, member=None):
+        """
+        Devuelve (header, reasons, ips) si el archivo no cambió desde la última ejecución.
+        En un comprimido, `member` indica de qué exportación.
+        """
+        entry = self._fresh_entry(path)
+        if entry is None:
+            return None
+        data = entry.get("members", {}).get(member) if member is not None else entry
+        if data is None or "header" not in data:
+            return None
+        return data["header"], data["reasons"], data["ips"]
+
+    def lookup_members(self, path):
+        """Devuelve las exportaciones guardadas de un comprimido sin cambios, o None."""
+        entry = self._fresh_entry(path)
+        if entry is None or "members" not in entry:
+            return None
+        return list(entry["members"])
+
+    def cached_counts(self, path, member=None):
+        """Devuelve los conteos de eventos guardados de un archivo, o None si no los hay."""
+        data = self._data(path, member).get("counts")
+        if data is None:
+            return None
+        return {
+            'ips': Counter(data['ips']),
+            'reasons': Counter(data['reasons']),
+            'pairs': Counter({(ip, reason): n for ip, reason, n in data['pairs']}),
+        }
+
+    def cached_pairs(self, path, member=None):
+        """Devuelve los pares (IP, razón) guardados de un archivo, o None si no los hay."""
+        data = self._data(path, member).get("pairs")
+        if data is None:
+            return None
+        return {(ip, reason) for ip, reason in data}
+
+    def cached_bursts(self, path, params, member=None):
+        """Devuelve las ráfagas guardadas de un archivo si se detectaron con los mismos parámetros."""
+        data = self._data(path, member).get("bursts")
+        if data is None or data["params"] != list(params):
+            return None
+        return {'ip': data['ip'], 'account': data['account']}
+
+    @staticmethod
+    def _pack(header, reasons, ips, counts=None, bursts=None, burst_params=None, pairs=None):
+        """Datos extraídos de un archivo (o de una exportación) en formato JSON."""
+        return {
+            "header": header,
+            "reasons": list(reasons),
+            "ips": list(ips),
+            "counts": None if counts is None else {
+                "ips": dict(counts['ips']),
+                "reasons": dict(counts['reasons']),
+                "pairs": [[ip, reason, n] for (ip, reason), n in counts['pairs'].items()],
+            },
+            "bursts": None if bursts is None else {
+                "params": list(burst_params), "ip": bursts['ip'], "account": bursts['account'],
+            },
+            "pairs": None if pairs is None else sorted([ip, reason] for ip, reason in pairs),
+        }
+
+    def _fingerprint(self, path, st):
+        return {
+            "size": st.st_size,
+            "mtime": st.st_mtime_ns,
+            "sha256": self.file_hash(path) if self.use_hash else None,
+        }
+
+    def store(self, path, header, reasons, ips, st=None, counts=None, bursts=None, burst_params=None,
+              pairs=None):
+        """
+        Registra los datos extraídos de un archivo junto con su huella.
+        `st` es el os.stat tomado antes de leer el archivo, para no asociar
+        datos antiguos a una versión modificada durante el procesamiento.
+        """
+        st = st or os.stat(path)
+        self.entries[os.path.abspath(path)] = {
+            **self._fingerprint(path, st),
+            **self._pack(header, reasons, ips, counts, bursts, burst_params, pairs),
+        }
+        self.dirty = True
+
+    def store_members(self, path, members, st=None, burst_params=None):
+        """
+        Registra los datos de cada exportación de un comprimido, dados como
+        [(miembro, (header, reasons, ips), detalles)], junto con la huella del comprimido.
+        """
+        st = st or os.stat(path)
+        self.entries[os.path.abspath(path)] = {
+            **self._fingerprint(path, st),
+            "members": {
+                member: self._pack(header, reasons, ips, details.get('counts'), details.get('bursts'),
+                                   burst_params, details.get('pairs'))
+                for member, (header, reasons, ips), details in members
+            },
+        }
+        self.dirty = True
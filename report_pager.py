@@ -0,0 +1,62 @@
+import os
+from array import array
+from functools import lru_cache
+
+# Tamaño de los bloques leídos al construir el índice de líneas
+INDEX_BLOCK_SIZE = 1 << 20
+
+class LineIndex:
+    """
+    Índice de los desplazamientos de inicio de cada línea de un archivo de texto, para
+    leer cualquier tramo de líneas con un seek sin cargar el archivo completo.
+
+    El índice se construye una sola vez recorriendo el archivo por bloques; después,
+    lines() lee solo los bytes del tramo pedido.
+    """
+    def __init__(self, path, encoding="utf-8"):
+        self.path = path
+        self.encoding = encoding
+        self.offsets = array('q', [0])
+        size = 0
+        with open(path, "rb") as f:
+            while True:
+                block = f.read(INDEX_BLOCK_SIZE)
+                if not block:
+                    break
+                find = block.find
+                position = find(b"\n")
+                while position != -1:
+                    self.offsets.append(size + position + 1)
+                    position = find(b"\n", position + 1)
+                size += len(block)
+        self.size = size
+        # Una última línea sin salto final también cuenta
+        if self.offsets[-1] != size:
+            self.offsets.append(size)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def lines(self, start, count):
+        """Devuelve las líneas [start, start + count) sin el salto de línea."""
+        start = max(0, min(start, len(self)))
+        end = max(start, min(start + count, len(self)))
+        if start == end:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self.offsets[start])
+            data = f.read(self.offsets[end] - self.offsets[start])
+        # Solo "\n" separa líneas, igual que al construir el índice
+        lines = data.decode(self.encoding, errors="replace").split("\n")
+        if data.endswith(b"\n"):
+            lines.pop()
+        return [line.rstrip("\r") for line in lines]
+
+@lru_cache(maxsize=32)
+def _cached_index(path, size, mtime_ns):
+    return LineIndex(path)
+
+def line_index(path):
+    """Índice de líneas del archivo, reutilizado mientras no cambien su tamaño ni su fecha."""
+    st = os.stat(path)
+    return _cached_index(os.path.abspath(path), st.st_size, st.st_mtime_ns)
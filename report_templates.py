@@ -0,0 +1,162 @@
+import os
+import re
+import string
+from collections import Counter
+from functools import lru_cache
+
+from aggregation import ACCOUNT_FIELD, DOMAIN_FIELD, PERIOD_FIELD, RECORDS_FIELD
+
+DEFAULT_HEADER = '''\
+Cordial Saludo
+
+Debido a los repetidos intentos fallidos de login recibidos, a continuación, les indico los detalles del hallazgo para que por favor procedan a canalizar su solución.
+
+'''
+
+DEFAULT_FOOTER = '''
+Después de analizar los logon failures del usuario, se pudo comprobar lo siguiente: Esta cuenta amerita realizar logoff/on de los equipos donde se encuentra logueado actualmente y borrar los datos del credential manager, ya que el mismo puede deberse a cambios recientes en la contraseña o a la necesidad de realizar el cambio.
+'''
+
+# Pies de mensaje por categoría de la razón de fallo predominante
+CATEGORY_FOOTERS = {
+    'bad_password': '''
+Después de analizar los logon failures del usuario, se pudo comprobar lo siguiente: Los intentos fallidos se deben a una contraseña incorrecta. Es probable que algún equipo, servicio o dispositivo siga usando una contraseña anterior, por lo que se recomienda revisar las sesiones abiertas y las credenciales guardadas (credential manager, unidades de red, tareas programadas) en los equipos desde los que se originan los intentos.
+''',
+    'locked_out': '''
+Después de analizar los logon failures del usuario, se pudo comprobar lo siguiente: La cuenta llegó a bloquearse por los intentos fallidos. Se recomienda desbloquearla, identificar en los equipos listados el origen de los intentos (sesiones abiertas, credenciales guardadas o servicios con la contraseña anterior) y, si las IPs no se reconocen, tratarlo como un posible ataque.
+''',
+    'expired': '''
+Después de analizar los logon failures del usuario, se pudo comprobar lo siguiente: La contraseña de la cuenta está vencida. El usuario debe cambiarla y luego realizar logoff/on de los equipos donde se encuentra logueado actualmente y actualizar los datos del credential manager.
+''',
+}
+
+# Expresiones de cada categoría, en orden de prioridad para los empates
+CATEGORY_PATTERNS = (
+    ('locked_out', re.compile(r"lock(ed)?\s*out|bloquead|0xC0000234", re.IGNORECASE)),
+    # Solo la contraseña vencida: una cuenta vencida ("Account expired", 0xC0000193) no encaja
+    ('expired', re.compile(r"(password|contraseña)\W+(\w+\W+){0,3}?(expired|expirad|vencid|caducad)"
+                           r"|(expired|expirad|vencid|caducad)\w*\W+(password|contraseña)"
+                           r"|must change|0xC0000071|0xC0000224", re.IGNORECASE)),
+    ('bad_password', re.compile(r"bad password|wrong password|contraseña incorrecta|0xC000006A", re.IGNORECASE)),
+)
+CATEGORY_ORDER = [name for name, _ in CATEGORY_PATTERNS]
+
+# Archivos de una carpeta de plantillas que reemplazan a las predefinidas
+HEADER_FILE = "encabezado.txt"
+FOOTER_FILE = "pie.txt"
+CATEGORY_FILE = "pie_{}.txt"
+
+@lru_cache(maxsize=4096)
+def reason_category(reason):
+    """Devuelve la categoría de una razón de fallo, o None si no encaja en ninguna."""
+    for name, pattern in CATEGORY_PATTERNS:
+        if pattern.search(reason):
+            return name
+    return None
+
+def template_fields(header):
+    """Campos de la cabecera disponibles en las plantillas (${cuenta}, ${dominio}, ...)."""
+    return {
+        'cuenta': header.get(ACCOUNT_FIELD, ""),
+        'dominio': header.get(DOMAIN_FIELD, ""),
+        'periodo': header.get(PERIOD_FIELD, ""),
+        'registros': header.get(RECORDS_FIELD, ""),
+        'reporte': header.get("Report Name", ""),
+    }
+
+class CompiledTemplate:
+    """
+    Plantilla con la sintaxis de string.Template (${campo}) analizada una sola vez en
+    trozos de texto fijo y campos. Cada combinación de valores de los campos usados
+    se renderiza una vez y se guarda en caché; sin campos, el texto es constante.
+    """
+    def __init__(self, text, cache_size=1024):
+        self.parts = []  # (texto fijo, campo o None)
+        names = []
+        position = 0
+        for m in string.Template.pattern.finditer(text):
+            literal = text[position:m.start()]
+            name = m.group('named') or m.group('braced')
+            if name:
+                self.parts.append((literal, name))
+                if name not in names:
+                    names.append(name)
+            else:
+                # $$ (o un $ suelto) se conserva como texto
+                self.parts.append((literal + ("$" if m.group('escaped') is not None else m.group(0)), None))
+            position = m.end()
+        self.parts.append((text[position:], None))
+        self.names = tuple(names)
+        self.cache_size = cache_size
+        self._render = lru_cache(maxsize=cache_size)(self._build)
+
+    def __getstate__(self):
+        # La caché no se serializa (el procesador se envía a los procesos del pool)
+        state = self.__dict__.copy()
+        del state['_render']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._render = lru_cache(maxsize=self.cache_size)(self._build)
+
+    def _build(self, values):
+        fields = dict(zip(self.names, values))
+        return "".join(literal + (fields[name] if name else "") for literal, name in self.parts)
+
+    def render(self, fields):
+        """Devuelve el texto con los campos sustituidos (vacíos si faltan)."""
+        return self._render(tuple(str(fields.get(name, "")) for name in self.names))
+
+class ReportTemplates:
+    """
+    Encabezado y pies de mensaje de los reportes finales, compilados una sola vez.
+    El pie se elige según la categoría predominante de las razones de fallo
+    (contraseña incorrecta, cuenta bloqueada o contraseña vencida). Una carpeta de
+    plantillas puede reemplazar cualquiera de ellos con encabezado.txt, pie.txt y
+    pie_<categoría>.txt.
+    """
+    def __init__(self, templates_dir=None):
+        header = DEFAULT_HEADER
+        footers = {'default': DEFAULT_FOOTER, **CATEGORY_FOOTERS}
+        if templates_dir:
+            header = self._read(templates_dir, HEADER_FILE, header)
+            footers['default'] = self._read(templates_dir, FOOTER_FILE, footers['default'])
+            for category in CATEGORY_ORDER:
+                footers[category] = self._read(templates_dir, CATEGORY_FILE.format(category), footers[category])
+        self.header = CompiledTemplate(header)
+        self.footers = {category: CompiledTemplate(text) for category, text in footers.items()}
+
+    @staticmethod
+    def _read(templates_dir, name, default):
+        path = os.path.join(templates_dir, name)
+        if not os.path.exists(path):
+            return default
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    @staticmethod
+    def category(reasons, counts=None):
+        """
+        Categoría predominante de las razones: la de más eventos si hay conteos, si no
+        la de más razones distintas; los empates se resuelven por CATEGORY_ORDER.
+        """
+        totals = Counter()
+        for reason in reasons:
+            category = reason_category(reason)
+            if category:
+                totals[category] += counts['reasons'].get(reason, 0) if counts else 1
+        if not totals:
+            return 'default'
+        return max(totals, key=lambda c: (totals[c], -CATEGORY_ORDER.index(c)))
+
+    def render(self, content, header, reasons, counts=None, category=None):
+        """
+        Compone el reporte final: encabezado, contenido y pie de la categoría (la
+        indicada en `category` o, si no, la calculada a partir de las razones).
+        """
+        fields = template_fields(header)
+        if category not in self.footers:
+            category = self.category(reasons, counts)
+        footer = self.footers[category]
+        return self.header.render(fields) + content + "\n" + footer.render(fields)
@@ -0,0 +1,84 @@
+import os
+import time
+import logging
+import threading
+
+def write_atomic(path, text):
+    """
+    Escribe un archivo de texto con un nombre temporal y lo renombra al terminar,
+    de modo que nunca queda a medio escribir con su nombre definitivo.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+class ReportWriter:
+    """
+    Escritura de reportes en segundo plano con un pool de hilos acotado.
+
+    submit() encola la escritura y vuelve enseguida, salvo que ya haya `max_pending`
+    escrituras en curso, en cuyo caso espera a que termine alguna (así la memoria de
+    los textos pendientes está acotada). flush() espera a que terminen todas y devuelve
+    su resultado; close() además detiene el pool.
+    """
+    def __init__(self, max_workers=4, max_pending=None):
+        from concurrent.futures import ThreadPoolExecutor  # Importación diferida
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report-writer")
+        self.slots = threading.BoundedSemaphore(max_pending or max_workers * 4)
+        self.pending = []
+
+    def _write(self, path, text, description):
+        start = time.perf_counter()
+        try:
+            write_atomic(path, text)
+            logging.info(f"{description} generado: {path}")
+            return time.perf_counter() - start, None
+        except Exception as e:
+            logging.error(f"Error al escribir {path}: {e}")
+            return time.perf_counter() - start, e
+        finally:
+            self.slots.release()
+
+    def submit(self, path, text, label=None, description="Reporte"):
+        """Encola la escritura de `text` en `path`; `label` identifica el archivo de origen."""
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(self._write, path, text, description)
+        except BaseException:
+            self.slots.release()
+            raise
+        self.pending.append((label, path, future))
+
+    def flush(self):
+        """
+        Espera a que terminen las escrituras pendientes.
+        Devuelve una lista de (label, ruta, segundos, error); error es None si fue bien.
+        """
+        results = []
+        for label, path, future in self.pending:
+            seconds, error = future.result()
+            results.append((label, path, seconds, error))
+        self.pending = []
+        return results
+
+    def close(self):
+        """Espera a las escrituras pendientes y detiene el pool; devuelve lo mismo que flush()."""
+        try:
+            return self.flush()
+        finally:
+            self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
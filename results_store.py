@@ -0,0 +1,257 @@
+import hashlib
+import json
+import sqlite3
+from collections import Counter
+from datetime import datetime
+
+from aggregation import (
+    DOMAIN_FIELD, PERIOD_FIELD, RECORDS_FIELD, header_accounts, parse_period_date,
+)
+
+RESULTS_DB = 'resultados.sqlite'
+STORE_VERSION = 3
+
+# Un mismo nombre de archivo puede tener varias exportaciones distintas (p. ej. el
+# LogonFailures.xlsx de cada día): se distinguen por la huella de su contenido
+SOURCES_TABLE = """
+CREATE TABLE IF NOT EXISTS {name} (
+    id INTEGER PRIMARY KEY,
+    filename TEXT NOT NULL,
+    fingerprint TEXT,
+    domain TEXT,
+    period TEXT,
+    period_start TEXT,
+    period_end TEXT,
+    records INTEGER,
+    processed_at TEXT NOT NULL,
+    burst_params TEXT,
+    UNIQUE (filename, fingerprint)
+);
+"""
+
+SCHEMA = SOURCES_TABLE.format(name="sources") + """
+CREATE TABLE IF NOT EXISTS header_fields (
+    source_id INTEGER NOT NULL REFERENCES sources(id) ON DELETE CASCADE,
+    field TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (source_id, field)
+);
+CREATE TABLE IF NOT EXISTS accounts (
+    source_id INTEGER NOT NULL REFERENCES sources(id) ON DELETE CASCADE,
+    account TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ips (
+    source_id INTEGER NOT NULL REFERENCES sources(id) ON DELETE CASCADE,
+    ip TEXT NOT NULL,
+    events INTEGER
+);
+CREATE TABLE IF NOT EXISTS reasons (
+    source_id INTEGER NOT NULL REFERENCES sources(id) ON DELETE CASCADE,
+    reason TEXT NOT NULL,
+    events INTEGER
+);
+CREATE TABLE IF NOT EXISTS ip_reasons (
+    source_id INTEGER NOT NULL REFERENCES sources(id) ON DELETE CASCADE,
+    ip TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    events INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bursts (
+    source_id INTEGER NOT NULL REFERENCES sources(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    start TEXT NOT NULL,
+    end TEXT NOT NULL,
+    events INTEGER NOT NULL,
+    peak INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ips_ip ON ips(ip);
+CREATE INDEX IF NOT EXISTS idx_ips_source ON ips(source_id);
+CREATE INDEX IF NOT EXISTS idx_reasons_source ON reasons(source_id);
+CREATE INDEX IF NOT EXISTS idx_ip_reasons_source ON ip_reasons(source_id);
+CREATE INDEX IF NOT EXISTS idx_bursts_source ON bursts(source_id);
+CREATE INDEX IF NOT EXISTS idx_accounts_account ON accounts(account);
+CREATE INDEX IF NOT EXISTS idx_accounts_source ON accounts(source_id);
+CREATE INDEX IF NOT EXISTS idx_sources_filename ON sources(filename);
+CREATE INDEX IF NOT EXISTS idx_sources_domain ON sources(domain);
+CREATE INDEX IF NOT EXISTS idx_sources_period ON sources(period_start, period_end);
+"""
+
+def _period_bounds(period):
+    """Devuelve el inicio y el fin del campo Period en formato ISO (None si no se reconocen)."""
+    parts = (period or "").split(" - ")
+    if len(parts) != 2:
+        return None, None
+    start, end = parse_period_date(parts[0]), parse_period_date(parts[1])
+    return (start.isoformat(sep=" ") if start else None,
+            end.isoformat(sep=" ") if end else None)
+
+def content_fingerprint(header, reasons, ips):
+    """
+    Huella de los datos extraídos de una exportación (cabecera, razones e IPs): es la
+    misma si se vuelve a procesar el mismo archivo o una copia, y cambia con otra exportación.
+    """
+    data = json.dumps([header, sorted(reasons), sorted(ips)], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+class ResultsStore:
+    """
+    Almacén SQLite de los resultados de extracción: un registro por archivo de origen
+    con sus campos de cabecera, cuentas, IPs y razones (y conteos y ráfagas si los hay),
+    indexado por IP, cuenta, dominio y periodo.
+
+    Cada archivo se identifica por su nombre y la huella de su contenido: volver a
+    guardar la misma exportación reemplaza sus datos, y otra con el mismo nombre se
+    añade al historial. Las inserciones de una ejecución van en una sola transacción:
+    begin() la abre y commit() la confirma.
+    """
+    def __init__(self, path=RESULTS_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        # Sin WAL: el archivo puede estar en una carpeta de red
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version == 1:
+            # La versión 1 no guardaba si se buscaron ráfagas
+            self.conn.execute("ALTER TABLE sources ADD COLUMN burst_params TEXT")
+        if version in (1, 2):
+            self._migrate_sources()
+        self.conn.executescript(SCHEMA)
+        if version != STORE_VERSION:
+            self.conn.execute(f"PRAGMA user_version = {STORE_VERSION}")
+
+    def _migrate_sources(self):
+        """
+        Migra la tabla sources de la versión 2, con un único registro por nombre de
+        archivo, a la actual, calculando la huella de los registros existentes.
+        """
+        conn = self.conn
+        columns = "id, filename, domain, period, period_start, period_end, records, processed_at, burst_params"
+        # SQLite no permite quitar la restricción UNIQUE: la tabla se reconstruye
+        conn.execute("PRAGMA foreign_keys = OFF")
+        try:
+            conn.execute("BEGIN")
+            conn.execute(SOURCES_TABLE.format(name="sources_v3"))
+            conn.execute(f"INSERT INTO sources_v3 ({columns}) SELECT {columns} FROM sources")
+            conn.execute("DROP TABLE sources")
+            conn.execute("ALTER TABLE sources_v3 RENAME TO sources")
+            for filename, in conn.execute("SELECT filename FROM sources").fetchall():
+                header, reasons, ips, _ = self.load(filename)
+                conn.execute("UPDATE sources SET fingerprint = ? WHERE filename = ?",
+                             (content_fingerprint(header, reasons, ips), filename))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.execute("PRAGMA foreign_keys = ON")
+
+    def begin(self):
+        """Abre la transacción de una ejecución."""
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN")
+
+    def commit(self):
+        """Confirma la transacción en curso."""
+        self.conn.commit()
+
+    def close(self):
+        """Cierra la conexión; lo no confirmado se descarta."""
+        self.conn.close()
+
+    def add(self, filename, header, reasons, ips, counts=None, bursts=None, burst_params=None):
+        """
+        Guarda los datos extraídos de un archivo de origen; si ya estaba la misma
+        exportación (mismo nombre y huella), los reemplaza.
+        `burst_params` ([umbral, ventana]) indica que se buscaron ráfagas, aunque no haya ninguna.
+        """
+        self.begin()
+        conn = self.conn
+        fingerprint = content_fingerprint(header, reasons, ips)
+        conn.execute("DELETE FROM sources WHERE filename = ? AND fingerprint = ?", (filename, fingerprint))
+
+        period = header.get(PERIOD_FIELD)
+        start, end = _period_bounds(period)
+        records = header.get(RECORDS_FIELD, "").strip()
+        cursor = conn.execute(
+            "INSERT INTO sources (filename, fingerprint, domain, period, period_start, period_end, records,"
+            " processed_at, burst_params) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (filename, fingerprint, header.get(DOMAIN_FIELD), period, start, end,
+             int(records) if records.isdigit() else None,
+             datetime.now().isoformat(sep=" ", timespec="seconds"),
+             json.dumps(list(burst_params)) if burst_params is not None else None),
+        )
+        source_id = cursor.lastrowid
+
+        conn.executemany("INSERT INTO header_fields VALUES (?, ?, ?)",
+                         [(source_id, k, v) for k, v in header.items()])
+        conn.executemany("INSERT INTO accounts VALUES (?, ?)",
+                         [(source_id, a) for a in header_accounts(header)])
+        ip_counts = counts['ips'] if counts else {}
+        reason_counts = counts['reasons'] if counts else {}
+        conn.executemany("INSERT INTO ips VALUES (?, ?, ?)",
+                         [(source_id, ip, ip_counts.get(ip)) for ip in ips])
+        conn.executemany("INSERT INTO reasons VALUES (?, ?, ?)",
+                         [(source_id, r, reason_counts.get(r)) for r in reasons])
+        if counts:
+            conn.executemany("INSERT INTO ip_reasons VALUES (?, ?, ?, ?)",
+                             [(source_id, ip, r, n) for (ip, r), n in counts['pairs'].items()])
+        if bursts:
+            conn.executemany(
+                "INSERT INTO bursts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(source_id, kind, b['key'], b['start'], b['end'], b['events'], b['peak'])
+                 for kind in ('ip', 'account') for b in bursts.get(kind, [])],
+            )
+        return source_id
+
+    def filenames(self):
+        """Nombres de los archivos de origen guardados."""
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT filename FROM sources ORDER BY filename")]
+
+    def source_id(self, filename):
+        """Identificador de la exportación más reciente guardada con ese nombre, o None."""
+        row = self.conn.execute(
+            "SELECT id FROM sources WHERE filename = ? ORDER BY processed_at DESC, id DESC LIMIT 1",
+            (filename,)).fetchone()
+        return row[0] if row else None
+
+    def load(self, filename):
+        """
+        Devuelve (header, reasons, ips, details) de la exportación más reciente guardada
+        con ese nombre, o None si no está. details incluye los conteos y las ráfagas
+        (con sus parámetros en 'burst_params') si se guardaron.
+        """
+        conn = self.conn
+        source_id = self.source_id(filename)
+        if source_id is None:
+            return None
+        burst_params, = conn.execute("SELECT burst_params FROM sources WHERE id = ?", (source_id,)).fetchone()
+
+        header = dict(conn.execute(
+            "SELECT field, value FROM header_fields WHERE source_id = ? ORDER BY rowid", (source_id,)))
+        ip_rows = conn.execute("SELECT ip, events FROM ips WHERE source_id = ? ORDER BY rowid",
+                               (source_id,)).fetchall()
+        reason_rows = conn.execute("SELECT reason, events FROM reasons WHERE source_id = ? ORDER BY rowid",
+                                   (source_id,)).fetchall()
+
+        details = {}
+        pairs = conn.execute("SELECT ip, reason, events FROM ip_reasons WHERE source_id = ?",
+                             (source_id,)).fetchall()
+        if any(events is not None for _, events in ip_rows + reason_rows):
+            details['counts'] = {
+                'ips': Counter({ip: n for ip, n in ip_rows if n is not None}),
+                'reasons': Counter({r: n for r, n in reason_rows if n is not None}),
+                'pairs': Counter({(ip, r): n for ip, r, n in pairs}),
+            }
+        burst_rows = conn.execute(
+            "SELECT kind, key, start, end, events, peak FROM bursts WHERE source_id = ? ORDER BY rowid",
+            (source_id,)).fetchall()
+        if burst_params is not None:
+            details['burst_params'] = json.loads(burst_params)
+        if burst_rows or burst_params is not None:
+            details['bursts'] = {'ip': [], 'account': []}
+            for kind, key, start, end, events, peak in burst_rows:
+                details['bursts'][kind].append(
+                    {'key': key, 'start': start, 'end': end, 'events': events, 'peak': peak})
+        return header, [r for r, _ in reason_rows], [ip for ip, _ in ip_rows], details
@@ -0,0 +1,39 @@
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+from automated_reports import ReportProcessor
+
+def write_export(path, account, ip, records):
+    """Exportación .xlsx de una cuenta con un único evento."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws["A3"] = "Domain Name : NORTE.LOCAL"
+    ws["A6"] = f"Object Name(s) : {account}"
+    ws["A8"] = f"Number of Records : {records}"
+    ws.cell(row=12, column=2, value=ip)
+    ws.cell(row=12, column=7, value="Bad password")
+    wb.save(path)
+
+def test_each_batch_rebuilds_the_whole_account_group(tmp_path):
+    (tmp_path / "in").mkdir()
+    write_export(tmp_path / "in" / "a.xlsx", "ana", "10.0.0.1", 30)
+    write_export(tmp_path / "in" / "b.xlsx", "ana", "10.0.0.2", 50)
+    (tmp_path / "in" / "c.csv").write_text("Client IP,Reason\n10.0.0.3,Bad password\n", encoding="utf-8")
+    (tmp_path / "in" / "d.csv").write_text("Client IP,Reason\n10.0.0.4,Bad password\n", encoding="utf-8")
+
+    processor = ReportProcessor(input_dir=str(tmp_path / "in"), temp_dir=str(tmp_path / "tmp"),
+                                output_dir=str(tmp_path / "out"), group_by_account=True,
+                                use_manifest=True)
+    processor.run(files=["a.xlsx"])
+    results = processor.run(files=["b.xlsx"])
+    assert results["failed"] == []
+    report = (tmp_path / "out" / "ana_NORTE.LOCAL_reporte_final.txt").read_text(encoding="utf-8")
+    assert "Number of Records: 80" in report
+    assert "10.0.0.1" in report and "10.0.0.2" in report
+
+    # Los CSV sin cabecera no tienen cuenta: cada uno conserva su propio reporte
+    processor.run(files=["c.csv", "d.csv"])
+    assert "10.0.0.3" in (tmp_path / "out" / "c_reporte_final.txt").read_text(encoding="utf-8")
+    assert "10.0.0.4" in (tmp_path / "out" / "d_reporte_final.txt").read_text(encoding="utf-8")
+    assert not list((tmp_path / "out").glob("*desconocida*"))
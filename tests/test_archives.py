@@ -0,0 +1,37 @@
+import io
+import zipfile
+
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+from automated_reports import ReportProcessor
+
+def export_bytes(account, domain, ip):
+    """Exportación .xlsx de una cuenta con un único evento."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws["A3"] = f"Domain Name : {domain}"
+    ws["A6"] = f"Object Name(s) : {account}"
+    ws.cell(row=12, column=2, value=ip)
+    ws.cell(row=12, column=7, value="Bad password")
+    data = io.BytesIO()
+    wb.save(data)
+    return data.getvalue()
+
+def test_each_archive_member_keeps_its_own_header(tmp_path):
+    (tmp_path / "in").mkdir()
+    with zipfile.ZipFile(tmp_path / "in" / "lote.zip", "w") as zf:
+        zf.writestr("dc1/LogonFailures.xlsx", export_bytes("ana", "NORTE.LOCAL", "10.0.0.1"))
+        zf.writestr("dc2/LogonFailures.xlsx", export_bytes("luis", "SUR.LOCAL", "10.0.0.2"))
+
+    processor = ReportProcessor(input_dir=str(tmp_path / "in"), temp_dir=str(tmp_path / "tmp"),
+                                output_dir=str(tmp_path / "out"), use_manifest=True)
+    for _ in range(2):  # La segunda pasada sale del manifiesto
+        results = processor.run(pipeline=True)
+        assert results["failed"] == []
+        first = (tmp_path / "out" / "lote_dc1_LogonFailures_reporte_final.txt").read_text(encoding="utf-8")
+        second = (tmp_path / "out" / "lote_dc2_LogonFailures_reporte_final.txt").read_text(encoding="utf-8")
+        assert "Object Name(s): ana" in first and "10.0.0.1" in first and "10.0.0.2" not in first
+        assert "Object Name(s): luis" in second and "10.0.0.2" in second and "10.0.0.1" not in second
+    assert processor.metrics["files"]["lote.zip"].get("cached")
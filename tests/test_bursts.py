@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+from automated_reports import ReportProcessor
+
+def write_export(path, events):
+    """Exportación .xlsx con la cabecera en las filas 1-9 y los eventos desde la fila 12."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws["A1"] = "Report Name : Logon Failures"
+    ws["A3"] = "Domain Name : EMPRESA.LOCAL"
+    ws["A6"] = "Object Name(s) : usuario"
+    ws.append([])
+    for row, (moment, ip) in enumerate(events, start=12):
+        ws.cell(row=row, column=1, value=moment)
+        ws.cell(row=row, column=2, value=ip)
+        ws.cell(row=row, column=5, value="usuario")
+        ws.cell(row=row, column=7, value="Bad password")
+    wb.save(path)
+
+def test_fast_xlsx_and_openpyxl_detect_the_same_bursts(tmp_path):
+    start = datetime(2025, 1, 6, 10, 0, 0)
+    # Horas exactas cuyo serial de Excel no es exacto en coma flotante
+    events = [(start + timedelta(minutes=m), "10.0.0.1") for m in (0, 1, 2, 3, 4, 5, 9, 10, 11)]
+    events += [(start + timedelta(hours=2, seconds=s), "10.0.0.2") for s in range(0, 70, 7)]
+    path = tmp_path / "export.xlsx"
+    write_export(path, events)
+
+    bursts = {}
+    for fast in (False, True):
+        processor = ReportProcessor(input_dir=str(tmp_path), temp_dir=str(tmp_path / "tmp"),
+                                    output_dir=str(tmp_path / "out"), fast_xlsx=fast,
+                                    burst_threshold=5, burst_window=10)
+        details = {}
+        processor.process_file(str(path), {}, details)
+        bursts[fast] = details["bursts"]
+
+    assert bursts[True] == bursts[False]
+    first = next(b for b in bursts[True]["ip"] if b["key"] == "10.0.0.1")
+    assert first["start"] == "2025-01-06 10:00:00"
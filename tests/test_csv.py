@@ -0,0 +1,33 @@
+from automated_reports import ReportProcessor
+
+def test_csv_metadata_preamble_is_the_header(tmp_path):
+    (tmp_path / "in").mkdir()
+    path = tmp_path / "in" / "export.csv"
+    path.write_text("Domain Name : NORTE.LOCAL\n"
+                    "Object Name(s) : ana\n"
+                    "Logon Time,Client IP,Reason\n"
+                    "2025-01-01 08:00:00,10.0.0.9,Bad password\n", encoding="utf-8")
+
+    processor = ReportProcessor(input_dir=str(tmp_path / "in"), temp_dir=str(tmp_path / "tmp"),
+                                output_dir=str(tmp_path / "out"))
+    header, reasons, ips = processor.process_file(str(path))
+    assert header == {"Domain Name": "NORTE.LOCAL", "Object Name(s)": "ana"}
+    assert header == processor.extract_header(str(path))
+    assert reasons == ["Bad password"] and ips == ["10.0.0.9"]
+
+def test_ipv6_spellings_are_counted_under_one_canonical_ip(tmp_path):
+    (tmp_path / "in").mkdir()
+    path = tmp_path / "in" / "export.csv"
+    path.write_text("Client IP,Reason\n"
+                    "2001:DB8::1,Bad password\n"
+                    "2001:0db8:0:0::1,Bad password\n"
+                    "2001:db8::1,Account locked\n", encoding="utf-8")
+
+    for count_events in (False, True):
+        processor = ReportProcessor(input_dir=str(tmp_path / "in"), temp_dir=str(tmp_path / "tmp"),
+                                    output_dir=str(tmp_path / "out"), count_events=count_events)
+        details = {}
+        header, reasons, ips = processor.process_file(str(path), details=details)
+        assert ips == ["2001:db8::1"]
+    assert details["counts"]["ips"] == {"2001:db8::1": 3}
+    assert details["counts"]["pairs"][("2001:db8::1", "Bad password")] == 2
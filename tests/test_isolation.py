@@ -0,0 +1,40 @@
+import multiprocessing
+
+import pytest
+
+resource = pytest.importorskip("resource")
+
+import automated_reports
+from automated_reports import ColumnAccumulator, ReportProcessor
+
+def virtual_memory_mb():
+    """Memoria virtual actual del proceso (VmSize), de la que parte el proceso aislado."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmSize:"):
+                return int(line.split()[1]) / 1024
+    pytest.skip("VmSize no disponible")
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                    reason="el lector parcheado solo llega al proceso aislado con fork")
+def test_file_over_memory_limit_is_reported_as_error(tmp_path, monkeypatch):
+    original = ColumnAccumulator.result
+
+    def greedy_result(self):
+        # Simula un archivo cuya lectura necesita más memoria de la permitida
+        bytearray(2 << 30)
+        return original(self)
+
+    monkeypatch.setattr(automated_reports.ColumnAccumulator, "result", greedy_result)
+    (tmp_path / "in").mkdir()
+    (tmp_path / "in" / "export.csv").write_text(
+        "Client IP,Reason\n10.0.0.1,Bad password\n", encoding="utf-8")
+
+    processor = ReportProcessor(input_dir=str(tmp_path / "in"), temp_dir=str(tmp_path / "tmp"),
+                                output_dir=str(tmp_path / "out"),
+                                file_memory_mb=virtual_memory_mb() + 256)
+    results = processor.run()
+
+    assert "export.csv" in results["errors"]
+    assert "memoria" in results["errors"]["export.csv"]
+    assert results["processed"] == []
@@ -0,0 +1,21 @@
+from history import ResultsHistory
+from results_store import ResultsStore
+
+WEEK1 = "Jan 01, 2025 00:00:00 - Jan 07, 2025 23:59:59"
+WEEK2 = "Jan 08, 2025 00:00:00 - Jan 14, 2025 23:59:59"
+
+def test_same_filename_keeps_history_of_each_export(tmp_path):
+    store = ResultsStore(str(tmp_path / "store.sqlite"))
+    header = {"Period": WEEK1, "Object Name(s)": "ana"}
+    store.add("LogonFailures.xlsx", header, ["Bad password"], ["10.0.0.1"])
+    # Volver a procesar la misma exportación la reemplaza
+    store.add("LogonFailures.xlsx", header, ["Bad password"], ["10.0.0.1"])
+    # La del día siguiente, con el mismo nombre, se añade al historial
+    store.add("LogonFailures.xlsx", dict(header, Period=WEEK2), ["Bad password"], ["10.0.0.1", "10.0.0.2"])
+    store.commit()
+
+    history = ResultsHistory(store)
+    assert [seen[1] for seen in history.ip_seen("10.0.0.1")] == ["2025-01-01 00:00:00", "2025-01-08 00:00:00"]
+    assert history.new_ips("LogonFailures.xlsx") == ("10.0.0.2",)
+    assert store.load("LogonFailures.xlsx")[0]["Period"] == WEEK2
+    assert store.filenames() == ["LogonFailures.xlsx"]
@@ -0,0 +1,24 @@
+import pytest
+
+from automated_reports import ReportProcessor
+
+@pytest.mark.parametrize("count_events", [False, True])
+def test_summary_reasons_are_per_ip(tmp_path, count_events):
+    (tmp_path / "in").mkdir()
+    (tmp_path / "in" / "export.csv").write_text(
+        "Client IP,Reason\n"
+        "10.0.0.1,Bad password\n"
+        "10.0.0.2,Account locked\n"
+        "10.0.0.2,Bad password\n", encoding="utf-8")
+
+    processor = ReportProcessor(input_dir=str(tmp_path / "in"), temp_dir=str(tmp_path / "tmp"),
+                                output_dir=str(tmp_path / "out"), aggregate=True,
+                                count_events=count_events, use_manifest=True)
+    for _ in range(2):  # La segunda pasada sale del manifiesto
+        processor.run(pipeline=True)
+        summary = (tmp_path / "out" / "resumen_consolidado.txt").read_text(encoding="utf-8")
+        first = summary.split("- 10.0.0.1:")[1].split("- 10.0.0.2:")[0]
+        second = summary.split("- 10.0.0.2:")[1].split("=== IPs por Cuenta")[0]
+        assert "Razones: Bad password\n" in first
+        assert "Razones: Account locked, Bad password\n" in second
+    assert processor.metrics["files"]["export.csv"].get("cached")
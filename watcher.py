@@ -0,0 +1,102 @@
+import os
+import time
+import logging
+
+from automated_reports import SOURCE_EXTENSIONS
+
+class FolderWatcher:
+    """
+    Vigila la carpeta de entrada y procesa con ReportProcessor los archivos nuevos
+    o modificados, una vez que terminan de escribirse.
+
+    Un archivo se considera completo cuando su tamaño y fecha de modificación no
+    cambian durante `settle` segundos y se puede abrir para lectura (en Windows
+    falla mientras otro proceso lo está escribiendo).
+    """
+    def __init__(self, processor, interval=2.0, settle=5.0, pipeline=True):
+        self.processor = processor
+        self.interval = interval
+        self.settle = settle
+        self.pipeline = pipeline
+        self.processed = {}  # nombre -> (tamaño, mtime) de la versión ya procesada
+        self.pending = {}    # nombre -> ((tamaño, mtime), instante del último cambio)
+
+    def scan(self):
+        """Devuelve {nombre: (tamaño, mtime)} de los archivos soportados de la carpeta de entrada."""
+        state = {}
+        try:
+            with os.scandir(self.processor.input_dir) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name.lower().endswith(SOURCE_EXTENSIONS):
+                        st = entry.stat()
+                        state[entry.name] = (st.st_size, st.st_mtime_ns)
+        except OSError as e:
+            logging.error(f"Error al leer la carpeta {self.processor.input_dir}: {e}")
+        return state
+
+    @staticmethod
+    def is_readable(path):
+        """Comprueba que el archivo se pueda abrir, es decir, que nadie lo tenga bloqueado."""
+        try:
+            with open(path, "rb"):
+                return True
+        except OSError:
+            return False
+
+    def poll(self):
+        """Revisa la carpeta una vez y devuelve los archivos listos para procesar."""
+        now = time.monotonic()
+        state = self.scan()
+        ready = []
+
+        for name in list(self.pending):
+            if name not in state:
+                del self.pending[name]
+        for name in list(self.processed):
+            if name not in state:
+                del self.processed[name]
+
+        for name, fingerprint in state.items():
+            if self.processed.get(name) == fingerprint:
+                continue
+            previous = self.pending.get(name)
+            if previous is None or previous[0] != fingerprint:
+                # Archivo nuevo o que sigue cambiando: esperar a que se estabilice
+                self.pending[name] = (fingerprint, now)
+                continue
+            if now - previous[1] >= self.settle and self.is_readable(os.path.join(self.processor.input_dir, name)):
+                ready.append(name)
+
+        return ready
+
+    def process(self, names):
+        """Procesa los archivos indicados y los marca como procesados."""
+        logging.info(f"Archivos nuevos o modificados: {', '.join(names)}")
+        try:
+            return self.processor.run(pipeline=self.pipeline, files=names)
+        finally:
+            # Los que fallan (o toda la tanda si run() lanza una excepción) también se
+            # marcan, para no reintentarlos en cada revisión hasta que cambien
+            for name in names:
+                fingerprint, _ = self.pending.pop(name)
+                self.processed[name] = fingerprint
+            # --rebuild solo se aplica a la primera pasada
+            self.processor.force_rebuild = False
+
+    def run(self, max_polls=None):
+        """Bucle principal de vigilancia; termina con Ctrl+C o tras `max_polls` revisiones."""
+        logging.info(f"Vigilando {self.processor.input_dir} (cada {self.interval}s)...")
+        polls = 0
+        try:
+            while max_polls is None or polls < max_polls:
+                ready = self.poll()
+                if ready:
+                    try:
+                        self.process(ready)
+                    except Exception as e:
+                        # Un error en una tanda no debe detener la vigilancia
+                        logging.error(f"Error al procesar {', '.join(ready)}: {e}")
+                polls += 1
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            logging.info("Vigilancia detenida.")